@@ -0,0 +1,6 @@
+"""Headless ground truth store: question store, document catalog and storage clients.
+
+Nothing here imports Streamlit. Settings come from a config file or the
+environment (see gtruth.config); the Streamlit app configures it from
+st.secrets through utils.
+"""
@@ -0,0 +1,5 @@
+import sys
+
+from gtruth.cli import main
+
+sys.exit(main())
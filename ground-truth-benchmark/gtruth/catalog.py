@@ -0,0 +1,155 @@
+import threading
+import time
+
+from gtruth.s3 import read_json_from_s3, update_json_in_s3
+
+# One compact object describing every document in SharePoint and S3:
+#   {"version": n,
+#    "documents": {name: {"sources", "size", "lastModified", "createdBy", "sha256"}},
+#    "hashes": {sha256: canonical name}}
+CATALOG_FILE = "catalog.json"
+CATALOG_REFRESH_TTL = 60  # seconds between listing refreshes in one process
+SOURCE_ORDER = ("SharePoint", "S3")
+
+_refresh_state = {"refreshed": 0.0}
+_refresh_lock = threading.Lock()
+
+
+def _empty_catalog():
+    return {"version": 0, "documents": {}}
+
+def _as_catalog(catalog):
+    """Return catalog if it is well formed, otherwise a fresh empty one."""
+    if isinstance(catalog, dict) and isinstance(catalog.get("documents"), dict):
+        return catalog
+    return _empty_catalog()
+
+def _sorted_sources(sources):
+    return sorted(set(sources), key=lambda s: SOURCE_ORDER.index(s) if s in SOURCE_ORDER else len(SOURCE_ORDER))
+
+def load_catalog():
+    """Return the persisted catalog as {name: entry}. The result is read-only."""
+    return _as_catalog(read_json_from_s3(CATALOG_FILE))["documents"]
+
+def load_hash_index():
+    """Return the persisted {sha256: canonical name} index. The result is read-only."""
+    catalog = read_json_from_s3(CATALOG_FILE)
+    if isinstance(catalog, dict) and isinstance(catalog.get("hashes"), dict):
+        return catalog["hashes"]
+    return {}
+
+def _rebuild_hash_index(catalog):
+    """Drop hashes whose document changed or vanished and index any new ones.
+
+    The first name a hash was recorded under stays canonical while it exists.
+    """
+    documents = catalog["documents"]
+    hashes = {
+        sha256: name
+        for sha256, name in catalog.get("hashes", {}).items()
+        if documents.get(name, {}).get("sha256") == sha256
+    }
+    for name, entry in sorted(documents.items()):
+        if entry.get("sha256"):
+            hashes.setdefault(entry["sha256"], name)
+    catalog["hashes"] = hashes
+    return catalog
+
+def catalog_is_stale(max_age=CATALOG_REFRESH_TTL):
+    """Check whether this process last refreshed the catalog more than max_age ago."""
+    with _refresh_lock:
+        return time.monotonic() - _refresh_state["refreshed"] >= max_age
+
+def _entries_from_listing(files):
+    """Merge per-source listing rows into catalog entries, preferring SharePoint metadata."""
+    entries = {}
+    for file in files:
+        entry = entries.setdefault(file["name"], {
+            "sources": [],
+            "size": file.get("size", 0),
+            "lastModified": file.get("lastModified", ""),
+            "createdBy": file.get("createdBy", "Unknown"),
+            "sha256": None,
+        })
+        entry["sources"].append(file["source"])
+        if file["source"] == "SharePoint":
+            entry.update(
+                size=file.get("size", entry["size"]),
+                lastModified=file.get("lastModified", entry["lastModified"]),
+                createdBy=file.get("createdBy", entry["createdBy"]),
+            )
+    for entry in entries.values():
+        entry["sources"] = _sorted_sources(entry["sources"])
+    return entries
+
+def refresh_catalog(files, sources=SOURCE_ORDER):
+    """Bring the catalog in line with a fresh storage listing.
+
+    files is the flat per-source list from get_files_from_storage and sources
+    names the backends it covers; entries from backends that could not be
+    listed are left alone. Known content hashes are kept while the size is
+    unchanged, and nothing is written if the catalog is already current.
+    """
+    listed = _entries_from_listing(files)
+
+    def apply_listing(catalog):
+        catalog = _as_catalog(catalog)
+        documents = catalog["documents"]
+        changed = False
+
+        for name in set(documents) | set(listed):
+            current = documents.get(name)
+            kept = [s for s in (current or {}).get("sources", []) if s not in sources]
+            entry = listed.get(name)
+
+            if entry is None:
+                if not kept:
+                    del documents[name]
+                    changed = True
+                    continue
+                entry = dict(current, sources=kept)
+            else:
+                entry = dict(entry, sources=_sorted_sources(entry["sources"] + kept))
+                if current and current.get("size") == entry["size"]:
+                    entry["sha256"] = current.get("sha256")
+
+            if entry != current:
+                documents[name] = entry
+                changed = True
+
+        if not changed:
+            return None
+        catalog["version"] += 1
+        return _rebuild_hash_index(catalog)
+
+    result = update_json_in_s3(CATALOG_FILE, apply_listing, indent=None)
+    with _refresh_lock:
+        _refresh_state["refreshed"] = time.monotonic()
+    return result
+
+def record_uploads(uploads):
+    """Write-through a batch of uploads into the catalog with a single write.
+
+    uploads is a list of dicts with name, sources, size and optionally
+    createdBy and sha256. Sources are added to any already on record.
+    """
+    if not uploads:
+        return True
+    now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+    def apply_uploads(catalog):
+        catalog = _as_catalog(catalog)
+        documents = catalog["documents"]
+        for upload in uploads:
+            current = documents.get(upload["name"], {})
+            documents[upload["name"]] = {
+                "sources": _sorted_sources(current.get("sources", []) + list(upload["sources"])),
+                "size": upload.get("size", current.get("size", 0)),
+                "lastModified": now,
+                "createdBy": upload.get("createdBy") or current.get("createdBy", "Unknown"),
+                "sha256": upload.get("sha256") or current.get("sha256"),
+            }
+        catalog["version"] += 1
+        return _rebuild_hash_index(catalog)
+
+    return update_json_in_s3(CATALOG_FILE, apply_uploads, indent=None)
@@ -0,0 +1,152 @@
+"""Command line interface: python -m gtruth {list,export,import,stats}.
+
+Store modules are imported by the command that needs them, so starting the
+CLI only costs argparse.
+"""
+import argparse
+import json
+import os
+import sys
+
+from gtruth.config import configure, load_config
+
+
+def _date_range(args):
+    if args.since or args.until:
+        return (args.since, args.until)
+    return None
+
+def _add_filter_arguments(parser):
+    parser.add_argument("--tag", action="append", dest="tags", help="only questions with this tag (repeatable, any of)")
+    parser.add_argument("--agent", action="append", dest="agents", help="only questions for this agent (repeatable)")
+    parser.add_argument("--since", help="only questions created on or after YYYY-MM-DD")
+    parser.add_argument("--until", help="only questions created on or before YYYY-MM-DD")
+
+def list_command(args):
+    from gtruth.export import question_matches
+    from gtruth.question_store import iter_question_batches
+
+    shown = 0
+    for _, questions in iter_question_batches():
+        for question_id, entry in questions.items():
+            if not question_matches(entry, args.tags, args.agents, _date_range(args)):
+                continue
+            if args.json:
+                print(json.dumps(dict(entry, question_id=question_id), ensure_ascii=False))
+            else:
+                print("\t".join([
+                    question_id,
+                    entry.get("created_on", ""),
+                    entry.get("agent_name", ""),
+                    entry.get("question", "").replace("\n", " ")
+                ]))
+            shown += 1
+            if args.limit and shown >= args.limit:
+                return 0
+    return 0
+
+def export_command(args):
+    from gtruth.export import export_questions
+
+    result = export_questions(
+        args.path,
+        fmt=args.format,
+        row_type=args.rows,
+        tags=args.tags,
+        agents=args.agents,
+        date_range=_date_range(args),
+        incremental=not args.full
+    )
+    print(f"Exported {result['questions']} questions ({result['rows']} rows) to {args.path}")
+    return 0
+
+def import_command(args):
+    from gtruth.importer import IMPORT_BATCH_SIZE, import_questions
+
+    fmt = args.format or ("csv" if args.file.lower().endswith(".csv") else "jsonl")
+    with open(args.file, "rb") as f:
+        result = import_questions(
+            f,
+            fmt,
+            submitted_by=args.user,
+            batch_size=args.batch_size or IMPORT_BATCH_SIZE,
+            dry_run=args.dry_run,
+            keep_submitted_by=args.keep_submitted_by
+        )
+
+    for line_number, message in result["errors"]:
+        print(f"{args.file}:{line_number}: {message}", file=sys.stderr)
+    if result["imported"] is None:
+        print("Failed to save the imported questions.", file=sys.stderr)
+        return 1
+    if args.dry_run:
+        print(f"{result['valid']} valid questions, {len(result['errors'])} problems")
+    else:
+        print(f"Imported {result['imported']} questions, {len(result['errors'])} problems")
+    return 1 if result["errors"] else 0
+
+def stats_command(args):
+    from gtruth.question_store import get_store_stats, load_facets
+
+    stats = get_store_stats()
+    facets = load_facets()
+    if args.json:
+        print(json.dumps(dict(stats, **{field: facets[field] for field in ("tags", "agents", "submitters")})))
+        return 0
+
+    print(f"Questions: {stats['questions']} (store version {stats['version']}, "
+          f"{stats['segments']} segments, {stats['pending']} pending)")
+    for field in ("agents", "tags", "submitters"):
+        counts = sorted(facets[field].items(), key=lambda item: (-item[1], item[0]))
+        print(f"\n{field.capitalize()} ({len(counts)}):")
+        for value, count in counts[:args.top]:
+            print(f"  {count:6d}  {value}")
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="gtruth", description="Ground truth benchmark store")
+    parser.add_argument("--config", help="TOML or JSON settings file (default: $GTRUTH_CONFIG or .streamlit/secrets.toml)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="list questions")
+    _add_filter_arguments(list_parser)
+    list_parser.add_argument("--limit", type=int, help="stop after this many questions")
+    list_parser.add_argument("--json", action="store_true", help="print full questions as JSON lines")
+    list_parser.set_defaults(handler=list_command)
+
+    export_parser = commands.add_parser("export", help="export questions to JSONL or Parquet")
+    export_parser.add_argument("path", help="JSONL file or Parquet directory")
+    export_parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    export_parser.add_argument("--rows", choices=["question", "partial_answer"], default="question",
+                               help="JSONL row granularity")
+    export_parser.add_argument("--full", action="store_true", help="rewrite the export instead of appending new questions")
+    _add_filter_arguments(export_parser)
+    export_parser.set_defaults(handler=export_command)
+
+    import_parser = commands.add_parser("import", help="bulk import questions from CSV or JSONL")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+    import_parser.add_argument("--user", default=os.environ.get("USER", "Unknown"), help="recorded as submitted_by")
+    import_parser.add_argument("--keep-submitted-by", action="store_true",
+                               help="keep the submitted_by of rows that have one instead of --user")
+    import_parser.add_argument("--batch-size", type=int)
+    import_parser.add_argument("--dry-run", action="store_true", help="validate without writing")
+    import_parser.set_defaults(handler=import_command)
+
+    stats_parser = commands.add_parser("stats", help="question counts by agent, tag and submitter")
+    stats_parser.add_argument("--top", type=int, default=10, help="values shown per facet")
+    stats_parser.add_argument("--json", action="store_true")
+    stats_parser.set_defaults(handler=stats_command)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure(load_config(args.config))
+    from gtruth.s3 import S3ReadError
+
+    try:
+        return args.handler(args)
+    except (OSError, ValueError, ImportError, RuntimeError, S3ReadError) as e:
+        print(f"gtruth: {e}", file=sys.stderr)
+        return 1
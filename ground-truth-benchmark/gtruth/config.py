@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+import threading
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11 can still use JSON config files
+    tomllib = None
+
+# Settings use the layout of .streamlit/secrets.toml:
+#   [aws]    AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION,
+#            S3_BUCKET_NAME, S3_DOCUMENTS_PREFIX
+#   [azure]  TENANT_ID, CLIENT_ID, CLIENT_SECRET
+#   [cache]  JSON_CACHE_TTL
+CONFIG_ENV = "GTRUTH_CONFIG"
+DEFAULT_CONFIG_FILE = os.path.join(".streamlit", "secrets.toml")
+
+# Environment variables override the config file
+ENV_SETTINGS = {
+    "AWS_ACCESS_KEY_ID": ("aws", "AWS_ACCESS_KEY_ID"),
+    "AWS_SECRET_ACCESS_KEY": ("aws", "AWS_SECRET_ACCESS_KEY"),
+    "AWS_REGION": ("aws", "AWS_REGION"),
+    "GTRUTH_S3_BUCKET_NAME": ("aws", "S3_BUCKET_NAME"),
+    "GTRUTH_S3_DOCUMENTS_PREFIX": ("aws", "S3_DOCUMENTS_PREFIX"),
+    "AZURE_TENANT_ID": ("azure", "TENANT_ID"),
+    "AZURE_CLIENT_ID": ("azure", "CLIENT_ID"),
+    "AZURE_CLIENT_SECRET": ("azure", "CLIENT_SECRET"),
+    "GTRUTH_JSON_CACHE_TTL": ("cache", "JSON_CACHE_TTL"),
+}
+
+_config = {"settings": None, "error_handler": None}
+_config_lock = threading.Lock()
+
+logger = logging.getLogger("gtruth")
+
+
+def _read_config_file(path):
+    """Parse a TOML or JSON config file."""
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    if tomllib is None:
+        raise RuntimeError("Reading TOML config files requires Python 3.11+; use a JSON file instead.")
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+def load_config(path=None):
+    """Load settings from a config file and the environment.
+
+    The file is path, else $GTRUTH_CONFIG, else .streamlit/secrets.toml if it
+    exists, so the CLI and the app can share one secrets file.
+    """
+    path = path or os.environ.get(CONFIG_ENV)
+    if path is None and os.path.exists(DEFAULT_CONFIG_FILE):
+        path = DEFAULT_CONFIG_FILE
+
+    settings = {}
+    if path:
+        settings = {section: dict(values) for section, values in _read_config_file(path).items() if isinstance(values, dict)}
+
+    for variable, (section, key) in ENV_SETTINGS.items():
+        if variable in os.environ:
+            settings.setdefault(section, {})[key] = os.environ[variable]
+    return settings
+
+def configure(settings):
+    """Use settings (a mapping of sections, e.g. st.secrets) for this process."""
+    with _config_lock:
+        _config["settings"] = settings
+
+def get_config():
+    """Return the process settings, loading them on first use if none were configured."""
+    with _config_lock:
+        if _config["settings"] is None:
+            _config["settings"] = load_config()
+        return _config["settings"]
+
+def get_setting(section, key, default=None):
+    """Return one setting, or default if it is not configured."""
+    values = get_config().get(section) or {}
+    return values.get(key, default)
+
+def set_error_handler(handler):
+    """Report store errors through handler(message), e.g. st.error, instead of the log."""
+    _config["error_handler"] = handler
+
+def report_error(message):
+    """Surface an error to the host application, or log it."""
+    if _config["error_handler"] is not None:
+        _config["error_handler"](message)
+    else:
+        logger.error(message)
@@ -0,0 +1,245 @@
+import glob
+import json
+import os
+
+from gtruth.question_store import iter_question_batches
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = pq = None
+
+JSONL_ROW_TYPES = ("question", "partial_answer")
+# Rows buffered before a Parquet row group is written
+PARQUET_CHUNK_ROWS = 10000
+PARQUET_PART_PATTERN = "part-{:05d}.parquet"
+PARQUET_STATE_FILE = "_export_state.json"
+
+# Local record of what an export already contains, so later runs only append
+# questions added since:
+#   {"filters": {...}, "segments": [segment ids read],
+#    "pending": [ids exported before they were compacted into a segment],
+#    "questions": n, "rows": n}
+
+
+def _state_file(path, fmt):
+    if fmt == "parquet":
+        return os.path.join(path, PARQUET_STATE_FILE)
+    return f"{path}.state.json"
+
+def _empty_state(filters):
+    return {"filters": filters, "segments": [], "pending": [], "questions": 0, "rows": 0}
+
+def _load_state(path, fmt, filters):
+    """Read the export state, checking it was produced with the same filters."""
+    try:
+        with open(_state_file(path, fmt)) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return _empty_state(filters)
+
+    if state.get("filters") != filters:
+        raise ValueError("The existing export was written with different filters; run a full export instead.")
+    return state
+
+def _save_state(path, fmt, state):
+    state_file = _state_file(path, fmt)
+    with open(f"{state_file}.tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(f"{state_file}.tmp", state_file)
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+def question_matches(entry, tags=None, agents=None, date_range=None):
+    """Check a question against the tag (any of), agent and created date filters."""
+    if agents and entry.get("agent_name", "") not in agents:
+        return False
+    if tags and set(tags).isdisjoint(entry.get("tags", [])):
+        return False
+    if date_range:
+        start, end = date_range
+        # created_on is stored as YYYY-MM-DD, so string comparison orders by date
+        created_on = entry.get("created_on", "")
+        if start and created_on < str(start):
+            return False
+        if end and created_on > str(end):
+            return False
+    return True
+
+def _new_questions(state, filters):
+    """Yield (question_id, entry) for matching questions not yet in the export.
+
+    Updates state as it goes: segments are recorded once read, and questions
+    exported while pending are skipped when they reappear in a segment.
+    """
+    exported_pending = set(state["pending"])
+
+    for segment_id, questions in iter_question_batches(skip_segments=state["segments"]):
+        for question_id, entry in questions.items():
+            if question_id in exported_pending:
+                if segment_id is not None:
+                    exported_pending.discard(question_id)
+                continue
+            if not question_matches(entry, **filters):
+                continue
+            if segment_id is None:
+                exported_pending.add(question_id)
+            yield question_id, entry
+        if segment_id is not None:
+            state["segments"].append(segment_id)
+
+    state["pending"] = sorted(exported_pending)
+
+def _question_row(question_id, entry):
+    return {
+        "question_id": question_id,
+        "question": entry.get("question", ""),
+        "agent_name": entry.get("agent_name", ""),
+        "tags": list(entry.get("tags", [])),
+        "created_on": entry.get("created_on", ""),
+        "submitted_by": entry.get("submitted_by", "Unknown"),
+    }
+
+def iter_jsonl_rows(question_id, entry, row_type="question"):
+    """Yield the JSONL rows of one question: the whole question, or one row per partial answer."""
+    row = _question_row(question_id, entry)
+    if row_type == "question":
+        row["partial_answers"] = entry.get("partial_answers", [])
+        yield row
+        return
+
+    for partial_index, pa_entry in enumerate(entry.get("partial_answers", [])):
+        yield dict(
+            row,
+            partial_index=partial_index,
+            answer=pa_entry.get("answer", ""),
+            references=pa_entry.get("references", [])
+        )
+
+def iter_reference_rows(question_id, entry):
+    """Yield one flat row per reference; partial answers without references get one row."""
+    row = _question_row(question_id, entry)
+    for partial_index, pa_entry in enumerate(entry.get("partial_answers", [])):
+        answer = dict(row, partial_index=partial_index, answer=pa_entry.get("answer", ""))
+        references = pa_entry.get("references", []) or [{}]
+        for ref in references:
+            yield dict(
+                answer,
+                document=ref.get("document"),
+                pages=[str(page) for page in _as_list(ref.get("page", ref.get("pages")))],
+                sources=_as_list(ref.get("source"))
+            )
+
+def _parquet_schema():
+    strings = pa.list_(pa.string())
+    return pa.schema([
+        ("question_id", pa.string()),
+        ("question", pa.string()),
+        ("agent_name", pa.string()),
+        ("tags", strings),
+        ("created_on", pa.string()),
+        ("submitted_by", pa.string()),
+        ("partial_index", pa.int32()),
+        ("answer", pa.string()),
+        ("document", pa.string()),
+        ("pages", strings),
+        ("sources", strings),
+    ])
+
+def _export_jsonl(path, questions, row_type, append):
+    question_count = row_count = 0
+    with open(path, "a" if append else "w", encoding="utf-8") as f:
+        for question_id, entry in questions:
+            question_count += 1
+            for row in iter_jsonl_rows(question_id, entry, row_type):
+                f.write(json.dumps(row, ensure_ascii=False))
+                f.write("\n")
+                row_count += 1
+    return question_count, row_count
+
+def _export_parquet(path, questions, append):
+    """Write the new questions as one additional part file of exploded references."""
+    os.makedirs(path, exist_ok=True)
+    parts = sorted(glob.glob(os.path.join(path, PARQUET_PART_PATTERN.replace("{:05d}", "*"))))
+    if not append:
+        for part in parts:
+            os.remove(part)
+        parts = []
+
+    schema = _parquet_schema()
+    part_file = os.path.join(path, PARQUET_PART_PATTERN.format(len(parts)))
+    columns = {name: [] for name in schema.names}
+    question_count = row_count = 0
+    writer = None
+
+    def flush():
+        nonlocal writer
+        if writer is None:
+            writer = pq.ParquetWriter(f"{part_file}.tmp", schema)
+        writer.write_batch(pa.record_batch([columns[name] for name in schema.names], schema=schema))
+        for values in columns.values():
+            values.clear()
+
+    try:
+        for question_id, entry in questions:
+            question_count += 1
+            for row in iter_reference_rows(question_id, entry):
+                for name in schema.names:
+                    columns[name].append(row[name])
+                row_count += 1
+                if len(columns["question_id"]) >= PARQUET_CHUNK_ROWS:
+                    flush()
+        if columns["question_id"]:
+            flush()
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is not None:
+        os.replace(f"{part_file}.tmp", part_file)
+    return question_count, row_count
+
+def export_questions(path, fmt="jsonl", row_type="question", tags=None, agents=None,
+                     date_range=None, incremental=True):
+    """Stream the question library to a JSONL file or a Parquet directory.
+
+    JSONL rows are one per question or one per partial answer (row_type);
+    Parquet rows are one per reference, written as part files in the path
+    directory. Questions are read one segment at a time and written in chunks,
+    so memory does not grow with the library. With incremental, only questions
+    added since the last export to the same path are appended.
+    Returns {"questions", "rows"} written by this run.
+    """
+    if fmt not in ("jsonl", "parquet"):
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if fmt == "jsonl" and row_type not in JSONL_ROW_TYPES:
+        raise ValueError(f"Unsupported row type: {row_type}")
+    if fmt == "parquet" and pa is None:
+        raise ImportError("Parquet export requires pyarrow (pip install pyarrow).")
+
+    filters = {
+        "tags": sorted(tags) if tags else None,
+        "agents": sorted(agents) if agents else None,
+        "date_range": [str(d) if d else None for d in date_range] if date_range else None,
+    }
+    if fmt == "jsonl":
+        filters["row_type"] = row_type
+
+    state = _load_state(path, fmt, filters) if incremental else _empty_state(filters)
+    append = incremental and bool(state["segments"] or state["pending"])
+    question_filters = {key: value for key, value in filters.items() if key != "row_type"}
+    questions = _new_questions(state, question_filters)
+
+    if fmt == "jsonl":
+        question_count, row_count = _export_jsonl(path, questions, row_type, append)
+    else:
+        question_count, row_count = _export_parquet(path, questions, append)
+
+    state["questions"] += question_count
+    state["rows"] += row_count
+    _save_state(path, fmt, state)
+    return {"questions": question_count, "rows": row_count}
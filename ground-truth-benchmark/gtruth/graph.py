@@ -0,0 +1,73 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Const
+GRAPH_TIMEOUT = (5, 60)  # (connect, read) seconds
+GRAPH_MAX_RETRIES = 4
+GRAPH_BACKOFF = 0.5  # seconds, doubled per retry before jitter
+GRAPH_MAX_RETRY_AFTER = 60  # never sleep longer than this for one retry
+GRAPH_POOL_SIZE = 20
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Non-idempotent requests are only retried when Graph rejected them outright
+RETRY_STATUSES_UNSAFE = {429, 503}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_graph_session():
+    """Returns the process-wide pooled session used for all Graph calls"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=GRAPH_POOL_SIZE)
+            session.mount("https://", adapter)
+            _session = session
+    return _session
+
+def _retry_delay(response, attempt):
+    """Seconds to wait before a retry, honouring Retry-After when present"""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), GRAPH_MAX_RETRY_AFTER)
+        except ValueError:
+            pass
+    return random.uniform(0, GRAPH_BACKOFF * (2 ** attempt))
+
+def graph_request(method, url, token=None, headers=None, timeout=GRAPH_TIMEOUT,
+                  retries=GRAPH_MAX_RETRIES, **kwargs):
+    """Sends a request through the shared session.
+
+    Throttled (429) and server error responses are retried with jittered
+    exponential backoff, or after the server's Retry-After. The last response
+    is returned once retries run out; connection errors are raised.
+    """
+    method = method.upper()
+    request_headers = {"Authorization": f"Bearer {token}"} if token else {}
+    if headers:
+        request_headers.update(headers)
+    retry_statuses = RETRY_STATUSES if method in IDEMPOTENT_METHODS else RETRY_STATUSES_UNSAFE
+
+    session = get_graph_session()
+    for attempt in range(retries + 1):
+        try:
+            response = session.request(method, url, headers=request_headers, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries or method not in IDEMPOTENT_METHODS:
+                raise
+            time.sleep(_retry_delay(None, attempt))
+            continue
+
+        if response.status_code not in retry_statuses or attempt == retries:
+            return response
+        time.sleep(_retry_delay(response, attempt))
+
+def graph_get(url, token=None, **kwargs):
+    """Sends a GET request to Graph"""
+    return graph_request("GET", url, token=token, **kwargs)
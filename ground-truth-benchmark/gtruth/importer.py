@@ -0,0 +1,250 @@
+import csv
+import io
+import json
+import re
+import time
+import uuid
+
+from itertools import islice
+
+from gtruth.catalog import load_catalog
+from gtruth.question_store import save_question_batches
+
+IMPORT_FORMATS = ("csv", "jsonl")
+# Rows validated together, and questions written per segment
+IMPORT_BATCH_SIZE = 500
+# CSV files have one row per reference; consecutive rows with the same question
+# and agent form one question, and consecutive rows with the same answer form
+# one partial answer. Tags are separated by CSV_TAG_SEPARATOR, pages by commas.
+CSV_REQUIRED_COLUMNS = ("question", "agent_name", "answer", "document")
+CSV_TAG_SEPARATOR = ";"
+# created_on is compared as a string by the library and export filters
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def _split(value, separator=","):
+    """Split a separated string, or pass a list through, dropping blanks.
+
+    Any other value, such as a page given as a JSON number, is one item.
+    """
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(separator)
+    elif not isinstance(value, (list, tuple)):
+        value = [value]
+    return [str(item).strip() for item in value if str(item).strip()]
+
+def _iter_jsonl(stream):
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            raw = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, [f"Invalid JSON: {e}"]
+            continue
+        if not isinstance(raw, dict):
+            yield line_number, None, ["Expected a JSON object"]
+            continue
+        yield line_number, raw, []
+
+def _iter_csv(stream):
+    reader = csv.DictReader(stream)
+    missing = [column for column in CSV_REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        yield 1, None, [f"Missing columns: {', '.join(missing)}"]
+        return
+
+    current, key, line_number = None, None, 0
+    for row in reader:
+        # Short rows have None for their missing fields
+        row_key = ((row.get("question") or "").strip(), (row.get("agent_name") or "").strip())
+        if not all(row_key):
+            if current is not None:
+                yield line_number, current, []
+                current, key = None, None
+            errors = []
+            if not row_key[0]:
+                errors.append("Question is required")
+            if not row_key[1]:
+                errors.append("Agent Name is required")
+            yield reader.line_num, None, errors
+            continue
+        if current is None or row_key != key:
+            if current is not None:
+                yield line_number, current, []
+            current, key, line_number = {
+                "question": row_key[0],
+                "agent_name": row_key[1],
+                "tags": _split(row.get("tags"), CSV_TAG_SEPARATOR),
+                "partial_answers": [],
+            }, row_key, reader.line_num
+
+        answer = (row.get("answer") or "").strip()
+        partial_answers = current["partial_answers"]
+        if answer and (not partial_answers or partial_answers[-1]["answer"] != answer):
+            partial_answers.append({"answer": answer, "references": []})
+        if partial_answers and (row.get("document") or "").strip():
+            partial_answers[-1]["references"].append({
+                "document": row["document"].strip(),
+                "page": _split(row.get("pages")),
+            })
+
+    if current is not None:
+        yield line_number, current, []
+
+def iter_import_rows(file, fmt):
+    """Stream-parse a CSV or JSONL file into (line number, raw entry, errors).
+
+    file may be a text or binary file object and is read line by line.
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+    stream = file if isinstance(file, io.TextIOBase) else io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        yield from (_iter_csv(stream) if fmt == "csv" else _iter_jsonl(stream))
+    finally:
+        if stream is not file:
+            stream.detach()  # leave the caller's file open
+
+def _valid_date(value):
+    if not DATE_PATTERN.match(value):
+        return False
+    try:
+        time.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        return False
+    return True
+
+def _normalize_entry(raw):
+    """Build a question entry in the app's schema from a raw row; returns (entry, errors)."""
+    errors = []
+    question = str(raw.get("question") or "").strip()
+    agent_name = str(raw.get("agent_name") or "").strip()
+    if not question:
+        errors.append("Question is required")
+    if not agent_name:
+        errors.append("Agent Name is required")
+
+    partial_answers = []
+    raw_partial_answers = raw.get("partial_answers") or []
+    if not isinstance(raw_partial_answers, list):
+        errors.append("partial_answers must be a list")
+        raw_partial_answers = []
+    for pa in raw_partial_answers:
+        answer = str(pa.get("answer") or "").strip() if isinstance(pa, dict) else ""
+        if not answer:
+            continue  # skip empty answers, as the form does
+        raw_references = pa.get("references") or []
+        if not isinstance(raw_references, list):
+            errors.append("references must be a list")
+            continue
+        references = [
+            {"document": str(ref["document"]).strip(), "page": _split(ref.get("page", ref.get("pages")))}
+            for ref in raw_references
+            if isinstance(ref, dict) and str(ref.get("document") or "").strip()
+        ]
+        if references:
+            partial_answers.append({"answer": answer, "references": references})
+    if not partial_answers:
+        errors.append("At least one partial answer with references is required")
+
+    created_on = str(raw.get("created_on") or "").strip()
+    if created_on and not _valid_date(created_on):
+        errors.append("created_on must be a YYYY-MM-DD date")
+
+    entry = {
+        "question": question,
+        "partial_answers": partial_answers,
+        "agent_name": agent_name,
+        "tags": _split(raw.get("tags")),
+        "created_on": created_on,
+        "submitted_by": str(raw.get("submitted_by") or ""),
+    }
+    return entry, errors
+
+def validate_import_rows(rows, catalog):
+    """Validate a batch of parsed rows against the schema and the document catalog.
+
+    Document names of the whole batch are checked against the catalog in one
+    pass. Yields (line number, entry or None, errors); valid entries have their
+    reference sources filled in from the catalog.
+    """
+    normalized = []
+    documents = set()
+    for line_number, raw, errors in rows:
+        entry = None
+        if raw is not None:
+            try:
+                entry, entry_errors = _normalize_entry(raw)
+            except Exception as e:
+                # One malformed field must not abort the rest of the import
+                normalized.append((line_number, None, errors + [f"Invalid row: {e}"]))
+                continue
+            errors = errors + entry_errors
+            documents.update(ref["document"] for pa in entry["partial_answers"] for ref in pa["references"])
+        normalized.append((line_number, entry, errors))
+
+    unknown = documents.difference(catalog)
+    for line_number, entry, errors in normalized:
+        if entry is not None:
+            missing = sorted({
+                ref["document"]
+                for pa in entry["partial_answers"]
+                for ref in pa["references"]
+                if ref["document"] in unknown
+            })
+            if missing:
+                errors = errors + [f"Unknown documents: {', '.join(missing)}"]
+        if errors:
+            yield line_number, None, errors
+            continue
+
+        for pa in entry["partial_answers"]:
+            for ref in pa["references"]:
+                ref["source"] = list(catalog[ref["document"]].get("sources", [])) or ["Unknown"]
+        yield line_number, entry, []
+
+def import_questions(file, fmt, submitted_by="Unknown", catalog=None,
+                     batch_size=IMPORT_BATCH_SIZE, dry_run=False, keep_submitted_by=False):
+    """Bulk import questions from a CSV or JSONL file.
+
+    Rows are parsed and validated batch_size at a time and every valid question
+    is committed to the store in a single manifest write. Invalid rows are
+    skipped and reported. With dry_run nothing is written.
+    Questions are attributed to submitted_by; only with keep_submitted_by (for
+    trusted command line migrations) does a row's own submitted_by win.
+    Returns {"valid", "imported", "errors": [(line number, message)]}; imported
+    is None if the store commit failed.
+    """
+    if catalog is None:
+        catalog = load_catalog()
+    created_on = time.strftime("%Y-%m-%d")
+    result = {"valid": 0, "imported": 0, "errors": []}
+    rows = iter_import_rows(file, fmt)
+
+    def batches():
+        while True:
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                return
+            batch = {}
+            for line_number, entry, errors in validate_import_rows(chunk, catalog):
+                if errors:
+                    result["errors"].extend((line_number, message) for message in errors)
+                    continue
+                entry["created_on"] = entry["created_on"] or created_on
+                if not (keep_submitted_by and entry["submitted_by"]):
+                    entry["submitted_by"] = submitted_by
+                batch[str(uuid.uuid4())] = entry
+            result["valid"] += len(batch)
+            yield batch
+
+    if dry_run:
+        for _ in batches():
+            pass
+    else:
+        result["imported"] = save_question_batches(batches())
+    return result
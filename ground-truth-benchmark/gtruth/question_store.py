@@ -0,0 +1,360 @@
+import copy
+import threading
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from gtruth.s3 import S3ReadError, read_json_from_s3, read_json_with_etag, write_json_to_s3, update_json_in_s3
+
+# Layout under json-db/:
+#   questions/<question_id>.json     one object per submitted question
+#   questions/segments/<id>.json     compacted batches of questions
+#   questions/manifest.json          segment list + ids not yet compacted
+#   questions/facets.json            tag / agent / submitter -> question count
+QUESTIONS_FOLDER = "questions/"
+MANIFEST_FILE = f"{QUESTIONS_FOLDER}manifest.json"
+FACETS_FILE = f"{QUESTIONS_FOLDER}facets.json"
+FACET_FIELDS = ("tags", "agents", "submitters")
+LEGACY_QUESTIONS_FILE = "submitted_questions.json"
+SEGMENT_SIZE = 50  # pending questions folded into one segment
+READ_WORKERS = 8
+# Segments and question objects are never rewritten, so their cache entries
+# never need revalidation.
+IMMUTABLE_TTL = float("inf")
+
+# Set once this process has seen a manifest, so writes skip the migration check
+_store_ready = {"ready": False}
+_store_ready_lock = threading.Lock()
+
+
+def _question_file(question_id):
+    return f"{QUESTIONS_FOLDER}{question_id}.json"
+
+def _segment_file(segment_id):
+    return f"{QUESTIONS_FOLDER}segments/{segment_id}.json"
+
+def _empty_manifest():
+    return {"version": 0, "segments": [], "pending": []}
+
+def _read_manifest():
+    """Read a private copy of the manifest, migrating the legacy store if it is missing.
+
+    Raises S3ReadError if the manifest cannot be read or is malformed; only a
+    manifest that does not exist triggers the migration.
+    """
+    manifest, etag = read_json_with_etag(MANIFEST_FILE, raise_errors=True)
+    if etag is None:
+        manifest = migrate_legacy_questions()
+    elif not (isinstance(manifest, dict) and "segments" in manifest):
+        raise S3ReadError(f"{MANIFEST_FILE} is malformed")
+
+    with _store_ready_lock:
+        _store_ready["ready"] = True
+    return copy.deepcopy(manifest)
+
+def _ensure_store():
+    """Make sure the manifest exists, reading it at most once per process."""
+    with _store_ready_lock:
+        if _store_ready["ready"]:
+            return
+    _read_manifest()
+
+def _write_segment(questions):
+    """Write a batch of questions as a new segment and return its manifest entry."""
+    segment_id = uuid.uuid4().hex
+    if not write_json_to_s3(_segment_file(segment_id), questions, indent=None):
+        return None
+    return {"id": segment_id, "count": len(questions)}
+
+def _read_object(file_name, cache=True):
+    """Read one immutable JSON object; raises S3ReadError if it cannot be read.
+
+    An object that does not exist reads as empty data, which callers skip.
+    """
+    data, _ = read_json_with_etag(file_name, ttl=IMMUTABLE_TTL, cache=cache, raise_errors=True)
+    return data
+
+def _read_objects(file_names):
+    """Read several immutable JSON objects from S3 in parallel; raises S3ReadError."""
+    if not file_names:
+        return []
+    with ThreadPoolExecutor(max_workers=min(READ_WORKERS, len(file_names))) as executor:
+        return list(executor.map(_read_object, file_names))
+
+def _as_manifest(manifest):
+    """Return manifest if it is well formed, otherwise a fresh empty one."""
+    if isinstance(manifest, dict) and "segments" in manifest:
+        return manifest
+    return _empty_manifest()
+
+def _empty_facets():
+    return {"questions": 0, "tags": {}, "agents": {}, "submitters": {}}
+
+def _count_question(facets, entry):
+    """Add one question to facet counts in O(number of tags)."""
+    facets["questions"] += 1
+    for tag in set(entry.get("tags", [])):
+        facets["tags"][tag] = facets["tags"].get(tag, 0) + 1
+    agent = entry.get("agent_name", "")
+    if agent:
+        facets["agents"][agent] = facets["agents"].get(agent, 0) + 1
+    submitter = entry.get("submitted_by", "Unknown")
+    facets["submitters"][submitter] = facets["submitters"].get(submitter, 0) + 1
+    return facets
+
+def _merge_facets(facets, delta):
+    """Add the counts of delta into facets."""
+    facets["questions"] += delta["questions"]
+    for field in FACET_FIELDS:
+        for value, count in delta[field].items():
+            facets[field][value] = facets[field].get(value, 0) + count
+    return facets
+
+def _is_facets(facets):
+    return isinstance(facets, dict) and all(field in facets for field in FACET_FIELDS)
+
+def rebuild_facets(questions=None):
+    """Recount the facet index from the whole library and persist it.
+
+    The write is conditional on the index read before counting, so a count
+    committed meanwhile by another session makes the recount start over
+    instead of being overwritten. If the library cannot be read completely
+    S3ReadError is raised and nothing is written, so a partial count never
+    replaces the index.
+    """
+    rebuilt = {}
+
+    def recount(_):
+        facets = _empty_facets()
+        for entry in (load_questions() if questions is None else questions).values():
+            _count_question(facets, entry)
+        rebuilt["facets"] = facets
+        return facets
+
+    update_json_in_s3(FACETS_FILE, recount, indent=None)
+    return rebuilt["facets"]
+
+def load_facets():
+    """Return {"tags", "agents", "submitters"} -> {value: question count}.
+
+    The index is a single small object kept up to date on every submit, so
+    reading it does not touch the questions. It is rebuilt only if it does not
+    exist or is malformed; S3ReadError is raised if it cannot be read. The
+    result is read-only.
+    """
+    facets, etag = read_json_with_etag(FACETS_FILE, raise_errors=True)
+    if etag is not None and _is_facets(facets):
+        return facets
+    return rebuild_facets()
+
+def migrate_legacy_questions():
+    """Split submitted_questions.json into segments and write the first manifest."""
+    legacy, _ = read_json_with_etag(LEGACY_QUESTIONS_FILE, raise_errors=True)
+    manifest = _empty_manifest()
+
+    if isinstance(legacy, dict) and legacy:
+        items = list(legacy.items())
+        for start in range(0, len(items), SEGMENT_SIZE):
+            segment = _write_segment(dict(items[start:start + SEGMENT_SIZE]))
+            if segment is None:
+                raise S3ReadError(f"Could not migrate {LEGACY_QUESTIONS_FILE}")
+            manifest["segments"].append(segment)
+        manifest["version"] = 1
+
+    if not write_json_to_s3(MANIFEST_FILE, manifest, indent=None, if_none_match=True):
+        # Another session migrated first; its manifest wins
+        existing = read_json_from_s3(MANIFEST_FILE, ttl=0)
+        if isinstance(existing, dict) and "segments" in existing:
+            return existing
+    return manifest
+
+def load_questions():
+    """Load every question from the sharded store as {question_id: entry}."""
+    questions, _ = load_questions_with_version()
+    return questions
+
+def load_questions_with_version():
+    """Load every question together with the manifest version it reflects.
+
+    The version changes whenever a question is added, so it can key caches
+    derived from the question library. Raises S3ReadError if any segment or
+    question cannot be read, rather than returning part of the library under
+    that version.
+    """
+    manifest = _read_manifest()
+    questions = {}
+
+    segments = _read_objects([_segment_file(s["id"]) for s in manifest["segments"]])
+    for segment in segments:
+        if isinstance(segment, dict):
+            questions.update(segment)
+
+    pending = manifest["pending"]
+    for question_id, entry in zip(pending, _read_objects([_question_file(q) for q in pending])):
+        if isinstance(entry, dict) and entry:
+            questions[question_id] = entry
+
+    return questions, manifest["version"]
+
+def get_store_stats():
+    """Return {"version", "questions", "segments", "pending"} from the manifest alone."""
+    manifest = _read_manifest()
+    return {
+        "version": manifest["version"],
+        "questions": sum(s["count"] for s in manifest["segments"]) + len(manifest["pending"]),
+        "segments": len(manifest["segments"]),
+        "pending": len(manifest["pending"]),
+    }
+
+def iter_question_batches(skip_segments=()):
+    """Stream the store as (segment_id, {question_id: entry}) one segment at a time.
+
+    Segments in skip_segments are not read. Pending questions come last with
+    segment_id None. Segments are fetched READ_WORKERS at a time and kept out
+    of the JSON cache, so memory stays bounded whatever the library size.
+    Raises S3ReadError if a segment or question cannot be read.
+    """
+    manifest = _read_manifest()
+    skip_segments = set(skip_segments)
+    segment_ids = [s["id"] for s in manifest["segments"] if s["id"] not in skip_segments]
+    read = partial(_read_object, cache=False)
+
+    if segment_ids:
+        with ThreadPoolExecutor(max_workers=min(READ_WORKERS, len(segment_ids))) as executor:
+            for start in range(0, len(segment_ids), READ_WORKERS):
+                window = segment_ids[start:start + READ_WORKERS]
+                segments = executor.map(read, [_segment_file(s) for s in window])
+                for segment_id, segment in zip(window, segments):
+                    if isinstance(segment, dict):
+                        yield segment_id, segment
+
+    pending = manifest["pending"]
+    yield None, {
+        question_id: entry
+        for question_id, entry in zip(pending, _read_objects([_question_file(q) for q in pending]))
+        if isinstance(entry, dict) and entry
+    }
+
+def compact_questions():
+    """Fold the pending questions into a new segment.
+
+    The segment is only added if every question in it is still pending; when
+    another session compacted some of them first, it is dropped and the rest
+    stay pending for the next compaction.
+    """
+    try:
+        pending = _read_manifest()["pending"]
+        entries = _read_objects([_question_file(q) for q in pending])
+    except S3ReadError:
+        return False
+    questions = {
+        question_id: entry
+        for question_id, entry in zip(pending, entries)
+        if isinstance(entry, dict) and entry
+    }
+    if not questions:
+        return True
+
+    segment = _write_segment(questions)
+    if segment is None:
+        return False
+
+    def fold_segment(manifest):
+        manifest = _as_manifest(manifest)
+        still_pending = set(manifest["pending"])
+        if not all(q in still_pending for q in questions):
+            return None  # another session compacted some of these questions first
+        manifest["segments"].append(segment)
+        manifest["pending"] = [q for q in manifest["pending"] if q not in questions]
+        return manifest
+
+    return update_json_in_s3(MANIFEST_FILE, fold_segment, indent=None)
+
+def save_question(question_id, entry):
+    """Store a single question; only its own object, the manifest and the facet
+    counts are written.
+
+    The manifest is updated with a conditional write, so concurrent submits
+    from other sessions are merged instead of overwritten.
+    """
+    try:
+        _ensure_store()
+    except S3ReadError:
+        return False
+    if not write_json_to_s3(_question_file(question_id), entry, indent=None):
+        return False
+
+    pending = {"count": 0, "added": False}
+
+    def add_pending(manifest):
+        manifest = _as_manifest(manifest)
+        if question_id in manifest["pending"]:
+            pending["added"] = False
+            return None
+        manifest["pending"].append(question_id)
+        manifest["version"] += 1
+        pending["count"] = len(manifest["pending"])
+        pending["added"] = True
+        return manifest
+
+    if not update_json_in_s3(MANIFEST_FILE, add_pending, indent=None):
+        return False
+    if not pending["added"]:
+        return True  # resubmitted while still pending; already counted
+
+    def count_question(facets):
+        if not _is_facets(facets):
+            return None  # missing index; load_facets rebuilds it with this question
+        return _count_question(facets, entry)
+
+    update_json_in_s3(FACETS_FILE, count_question, indent=None)
+
+    if pending["count"] >= SEGMENT_SIZE:
+        compact_questions()
+    return True
+
+def save_question_batches(batches):
+    """Store many new questions with a single manifest and facet commit.
+
+    batches yields {question_id: entry} dicts; each is written as its own
+    segment as soon as it arrives, so only one batch is held in memory. The
+    segments become visible together when the manifest is updated at the end,
+    so an interrupted import leaves the store unchanged. Returns the number of
+    questions stored, or None if nothing could be committed.
+    """
+    try:
+        _ensure_store()
+    except S3ReadError:
+        return None
+    segments = []
+    delta = _empty_facets()
+    for batch in batches:
+        if not batch:
+            continue
+        segment = _write_segment(batch)
+        if segment is None:
+            return None
+        segments.append(segment)
+        for entry in batch.values():
+            _count_question(delta, entry)
+
+    if not segments:
+        return 0
+
+    def add_segments(manifest):
+        manifest = _as_manifest(manifest)
+        manifest["segments"].extend(segments)
+        manifest["version"] += 1
+        return manifest
+
+    if not update_json_in_s3(MANIFEST_FILE, add_segments, indent=None):
+        return None
+
+    def count_questions(facets):
+        if not _is_facets(facets):
+            return None  # missing index; load_facets rebuilds it with these questions
+        return _merge_facets(facets, delta)
+
+    update_json_in_s3(FACETS_FILE, count_questions, indent=None)
+    return delta["questions"]
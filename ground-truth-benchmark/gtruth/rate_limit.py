@@ -0,0 +1,228 @@
+import abc
+import os
+import sqlite3
+import stat
+import threading
+import time
+
+from collections import OrderedDict
+
+from gtruth.config import get_setting, logger
+
+# Backend is chosen with [auth] RATE_LIMIT_BACKEND: "sqlite" (default) keeps
+# one budget for every worker process on the host, "memory" one per process
+RATE_LIMIT_BACKENDS = ("sqlite", "memory")
+# The database lives in a directory only the app's user can write, never in
+# the shared temp dir where other local users could edit or pre-create it
+RATE_LIMIT_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "gtruth"
+)
+RATE_LIMIT_DB = os.path.join(RATE_LIMIT_DIR, "rate_limit.sqlite3")
+RATE_LIMIT_MAX_KEYS = 10000  # least recently used keys are evicted past this
+SQLITE_TIMEOUT = 5  # seconds to wait for another process's write lock
+SQLITE_EVICT_EVERY = 100  # writes between eviction sweeps
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def _window_state(window_start, current, previous, now, window):
+    """Roll a sliding-window counter forward to now; returns (window_start, current, previous)."""
+    elapsed_windows = int((now - window_start) // window)
+    if elapsed_windows == 1:
+        return window_start + window, 0, current
+    if elapsed_windows > 1:
+        return window_start + elapsed_windows * window, 0, 0
+    return window_start, current, previous
+
+def _retry_after(window_start, current, previous, now, window, max_attempts):
+    """Seconds until the weighted count drops below max_attempts (0 = allowed now).
+
+    The count is previous * (share of the previous window still inside the
+    sliding window) + current.
+    """
+    elapsed = now - window_start
+    if previous * (1 - elapsed / window) + current < max_attempts:
+        return 0
+    if current >= max_attempts:
+        # Wait for the next window, until the current count has decayed enough
+        return window_start + window + window * (1 - max_attempts / current) - now
+    return window_start + window * (1 - (max_attempts - current) / previous) - now
+
+
+def _check_private(path, info):
+    """Raise PermissionError unless path is owned by this user and nobody else can write it."""
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        raise PermissionError(f"{path} is owned by another user")
+    if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(f"{path} is writable by other users")
+
+def _prepare_db_file(path):
+    """Create the limiter database and its directory private to this user.
+
+    SQLite keeps its -wal and -shm files next to the database, so the
+    directory must be private too. Existing files that another user owns or
+    can write are refused.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    _check_private(directory, os.stat(directory))
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600)
+    try:
+        _check_private(path, os.fstat(fd))
+    finally:
+        os.close(fd)
+
+
+class RateLimiter(abc.ABC):
+    """Sliding-window counter of failed attempts per key, O(1) per check.
+
+    Subclasses store one (window_start, current, previous) row per key.
+    """
+
+    def __init__(self, max_attempts, window, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_attempts = max_attempts
+        self.window = window
+        self.max_keys = max_keys
+
+    @abc.abstractmethod
+    def check(self, key):
+        """Return the seconds key must wait before another attempt (0 = allowed)."""
+
+    @abc.abstractmethod
+    def hit(self, key):
+        """Record one failed attempt for key."""
+
+    @abc.abstractmethod
+    def reset(self, key):
+        """Forget every attempt recorded for key."""
+
+
+class MemoryRateLimiter(RateLimiter):
+    """Per-process limiter in an LRU-bounded OrderedDict."""
+
+    def __init__(self, max_attempts, window, max_keys=RATE_LIMIT_MAX_KEYS):
+        super().__init__(max_attempts, window, max_keys)
+        self._counters = OrderedDict()  # key -> (window_start, current, previous)
+        self._lock = threading.Lock()
+
+    def check(self, key):
+        now = time.time()
+        with self._lock:
+            state = self._counters.get(key)
+            if state is None:
+                return 0
+            state = _window_state(*state, now, self.window)
+            return _retry_after(*state, now, self.window, self.max_attempts)
+
+    def hit(self, key):
+        now = time.time()
+        with self._lock:
+            window_start, current, previous = _window_state(*self._counters.get(key, (now, 0, 0)), now, self.window)
+            self._counters[key] = (window_start, current + 1, previous)
+            self._counters.move_to_end(key)
+            while len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+
+    def reset(self, key):
+        with self._lock:
+            self._counters.pop(key, None)
+
+
+class SQLiteRateLimiter(RateLimiter):
+    """Limiter in a local SQLite file shared by every process on the host.
+
+    Each thread uses its own connection; updates run in an immediate
+    transaction so concurrent workers never lose a hit.
+    """
+
+    def __init__(self, max_attempts, window, max_keys=RATE_LIMIT_MAX_KEYS, path=RATE_LIMIT_DB):
+        super().__init__(max_attempts, window, max_keys)
+        _prepare_db_file(path)
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS attempts ("
+                "key TEXT PRIMARY KEY, window_start REAL, current INTEGER, previous INTEGER, touched REAL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS attempts_touched ON attempts (touched)")
+
+    def _connect(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=SQLITE_TIMEOUT, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def _read(self, connection, key):
+        return connection.execute(
+            "SELECT window_start, current, previous FROM attempts WHERE key = ?", (key,)
+        ).fetchone()
+
+    def check(self, key):
+        now = time.time()
+        state = self._read(self._connect(), key)
+        if state is None:
+            return 0
+        state = _window_state(*state, now, self.window)
+        return _retry_after(*state, now, self.window, self.max_attempts)
+
+    def hit(self, key):
+        now = time.time()
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            window_start, current, previous = _window_state(*(self._read(connection, key) or (now, 0, 0)), now, self.window)
+            connection.execute(
+                "INSERT OR REPLACE INTO attempts (key, window_start, current, previous, touched) VALUES (?, ?, ?, ?, ?)",
+                (key, window_start, current + 1, previous, now)
+            )
+            self._writes += 1
+            if self._writes % SQLITE_EVICT_EVERY == 0:
+                self._evict(connection, now)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _evict(self, connection, now):
+        """Drop keys idle for two windows, then the least recently used past max_keys."""
+        connection.execute("DELETE FROM attempts WHERE touched < ?", (now - 2 * self.window,))
+        connection.execute(
+            "DELETE FROM attempts WHERE key IN (SELECT key FROM attempts ORDER BY touched DESC LIMIT -1 OFFSET ?)",
+            (self.max_keys,)
+        )
+
+    def reset(self, key):
+        self._connect().execute("DELETE FROM attempts WHERE key = ?", (key,))
+
+
+def create_rate_limiter(max_attempts, window, backend=None):
+    """Build the configured limiter, falling back to memory if the SQLite file is unusable.
+
+    A fallback is logged, since each worker process then keeps its own budget.
+    """
+    backend = backend or get_setting("auth", "RATE_LIMIT_BACKEND", "sqlite")
+    if backend not in RATE_LIMIT_BACKENDS:
+        raise ValueError(f"Unknown rate limit backend: {backend}")
+    max_keys = int(get_setting("auth", "RATE_LIMIT_MAX_KEYS", RATE_LIMIT_MAX_KEYS))
+
+    if backend == "sqlite":
+        path = get_setting("auth", "RATE_LIMIT_DB", RATE_LIMIT_DB)
+        try:
+            return SQLiteRateLimiter(max_attempts, window, max_keys, path)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Login rate limits fall back to per-process memory: %s: %s", path, e)
+    return MemoryRateLimiter(max_attempts, window, max_keys)
+
+def get_rate_limiter(max_attempts, window):
+    """Return the process-wide limiter, creating it on first use."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = create_rate_limiter(max_attempts, window)
+        return _limiter
@@ -0,0 +1,149 @@
+import re
+import threading
+
+from bisect import bisect_right, insort
+
+PAGE_RANGE_PATTERN = re.compile(r"^(\d+)(?:\s*[-–]\s*(\d+))?$")
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def parse_pages(pages):
+    """Parse page references into sorted, merged (start, end) intervals.
+
+    Accepts a list of strings or a comma-separated string; entries may be
+    single pages ("4") or ranges ("3-7"). Entries that are not page numbers
+    are ignored.
+    """
+    if isinstance(pages, str):
+        pages = pages.split(",")
+
+    intervals = []
+    for page in pages or []:
+        match = PAGE_RANGE_PATTERN.match(str(page).strip())
+        if not match:
+            continue
+        start = int(match.group(1))
+        end = int(match.group(2) or start)
+        intervals.append((min(start, end), max(start, end)))
+
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class ReferenceIndex:
+    """Reverse index from document and page interval to citing partial answers.
+
+    Citations are (question_id, partial answer index) pairs. References that
+    give no page numbers cite the document as a whole.
+    """
+
+    def __init__(self):
+        self.intervals = {}  # document -> sorted [(start, end, question_id, partial_index)]
+        self.whole = {}  # document -> {(question_id, partial_index)}
+        self.question_documents = {}  # question_id -> {documents it cites}
+        self.document_counts = {}  # document -> number of questions citing it
+        self.version = None
+
+    def __contains__(self, question_id):
+        return question_id in self.question_documents
+
+    def add(self, question_id, entry):
+        """Index every reference of one question."""
+        if question_id in self:
+            self.remove(question_id)
+
+        documents = set()
+        for partial_index, pa in enumerate(entry.get("partial_answers", [])):
+            for ref in pa.get("references", []):
+                document = ref.get("document")
+                if not document:
+                    continue
+                documents.add(document)
+                intervals = parse_pages(ref.get("page", ref.get("pages", [])))
+                if not intervals:
+                    self.whole.setdefault(document, set()).add((question_id, partial_index))
+                for start, end in intervals:
+                    insort(self.intervals.setdefault(document, []), (start, end, question_id, partial_index))
+        self.question_documents[question_id] = documents
+        for document in documents:
+            self.document_counts[document] = self.document_counts.get(document, 0) + 1
+
+    def remove(self, question_id):
+        """Drop every reference of one question."""
+        for document in self.question_documents.pop(question_id, set()):
+            self.document_counts[document] -= 1
+            if not self.document_counts[document]:
+                del self.document_counts[document]
+            if document in self.intervals:
+                self.intervals[document] = [i for i in self.intervals[document] if i[2] != question_id]
+                if not self.intervals[document]:
+                    del self.intervals[document]
+            if document in self.whole:
+                self.whole[document] = {c for c in self.whole[document] if c[0] != question_id}
+                if not self.whole[document]:
+                    del self.whole[document]
+
+    def sync(self, questions):
+        """Index questions that are new and drop ones that are gone."""
+        for question_id in [q for q in self.question_documents if q not in questions]:
+            self.remove(question_id)
+        for question_id, entry in questions.items():
+            if question_id not in self:
+                self.add(question_id, entry)
+
+    def citing(self, document, first_page=None, last_page=None):
+        """Return sorted (question_id, partial_index) pairs citing a document.
+
+        With a page range, only citations whose pages overlap it are returned,
+        plus citations of the document as a whole.
+        """
+        citations = set(self.whole.get(document, set()))
+        intervals = self.intervals.get(document, [])
+
+        if first_page is None and last_page is None:
+            citations.update((i[2], i[3]) for i in intervals)
+            return sorted(citations)
+
+        first_page = first_page if first_page is not None else 0
+        last_page = last_page if last_page is not None else float("inf")
+        # Intervals are sorted by start, so only those starting by last_page can overlap
+        candidates = intervals[:bisect_right(intervals, (last_page, float("inf")))]
+        citations.update((i[2], i[3]) for i in candidates if i[1] >= first_page)
+        return sorted(citations)
+
+    def cited_documents(self):
+        """Return {document: number of questions citing it}."""
+        return dict(self.document_counts)
+
+    def unused_documents(self, document_names):
+        """Return the documents from document_names that no question cites."""
+        return sorted(name for name in document_names if name not in self.intervals and name not in self.whole)
+
+
+def get_reference_index(questions, version):
+    """Return the process-wide reference index brought up to date with questions.
+
+    With version None the index is always synced, which only indexes the
+    questions it does not have yet.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ReferenceIndex()
+        if version is None or _index.version != version:
+            _index.sync(questions)
+            _index.version = version
+        return _index
+
+def index_question_references(question_id, entry):
+    """Add a newly submitted question to the in-memory reference index."""
+    with _index_lock:
+        if _index is not None:
+            _index.add(question_id, entry)
@@ -0,0 +1,411 @@
+import copy
+import io
+import json
+import os
+import random
+import threading
+import time
+
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+
+from gtruth.config import get_setting, report_error, set_error_handler
+
+S3_FOLDER = "json-db/"
+
+# Seconds a document listing is reused before it is refreshed from S3
+LISTING_TTL = 60
+LISTING_WORKERS = 8
+
+# Multipart settings for document uploads; memory per upload is bounded by
+# MULTIPART_CHUNKSIZE * MULTIPART_CONCURRENCY regardless of file size
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+MULTIPART_CONCURRENCY = 4
+
+# Seconds a cached JSON file is served before it is revalidated by ETag,
+# unless [cache] JSON_CACHE_TTL is configured
+JSON_CACHE_TTL = 30
+
+# Conditional writes that lose a race are retried this many times
+CONDITIONAL_WRITE_RETRIES = 5
+CONDITIONAL_WRITE_BACKOFF = 0.1  # seconds, doubled per retry
+
+_json_cache = {}
+_json_cache_lock = threading.Lock()
+
+_document_index = {}
+_document_index_lock = threading.Lock()
+
+# boto3 is imported and the client built on first use
+_client = {"s3": None, "transfer_config": None}
+_client_lock = threading.Lock()
+
+
+def get_bucket_name():
+    return get_setting("aws", "S3_BUCKET_NAME")
+
+def get_documents_prefix():
+    """Prefix documents are uploaded and listed under ("" = bucket root)."""
+    return get_setting("aws", "S3_DOCUMENTS_PREFIX", "")
+
+def _json_cache_ttl():
+    return float(get_setting("cache", "JSON_CACHE_TTL", JSON_CACHE_TTL))
+
+def get_s3_client():
+    """Return the process-wide S3 client, creating it from the settings on first use."""
+    with _client_lock:
+        if _client["s3"] is None:
+            import boto3
+
+            _client["s3"] = boto3.client(
+                "s3",
+                aws_access_key_id=get_setting("aws", "AWS_ACCESS_KEY_ID"),
+                aws_secret_access_key=get_setting("aws", "AWS_SECRET_ACCESS_KEY"),
+                region_name=get_setting("aws", "AWS_REGION")
+            )
+        return _client["s3"]
+
+def _get_transfer_config():
+    with _client_lock:
+        if _client["transfer_config"] is None:
+            from boto3.s3.transfer import TransferConfig
+
+            _client["transfer_config"] = TransferConfig(
+                multipart_threshold=MULTIPART_THRESHOLD,
+                multipart_chunksize=MULTIPART_CHUNKSIZE,
+                max_concurrency=MULTIPART_CONCURRENCY,
+                use_threads=True
+            )
+        return _client["transfer_config"]
+
+def _empty_json(file_name):
+    """Default value returned for a JSON file that is missing or unreadable."""
+    if file_name.endswith("questions.json") or "questions" in file_name:
+        return []
+    return {}
+
+def _is_not_modified(error):
+    """Check whether a ClientError is the 304 answer to a conditional GET."""
+    status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return status == 304 or error.response["Error"]["Code"] in ("304", "NotModified")
+
+def _cache_json(s3_key, data, etag):
+    """Store a parsed JSON object and its ETag in the process-wide cache."""
+    with _json_cache_lock:
+        _json_cache[s3_key] = {"data": data, "etag": etag, "checked": time.monotonic()}
+
+def invalidate_json_cache(file_name=None):
+    """Drop one cached JSON file, or the whole cache when no name is given."""
+    with _json_cache_lock:
+        if file_name is None:
+            _json_cache.clear()
+        else:
+            _json_cache.pop(f"{S3_FOLDER}{file_name}", None)
+
+def _is_write_conflict(error):
+    """Check whether a ClientError means a conditional put lost a race."""
+    status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    code = error.response["Error"]["Code"]
+    return status in (409, 412) or code in ("PreconditionFailed", "ConditionalRequestConflict")
+
+class S3ReadError(Exception):
+    """A JSON file could not be read for a reason other than not existing."""
+
+
+def read_json_with_etag(file_name, ttl=None, cache=True, raise_errors=False):
+    """Read and parse a JSON file from S3, returning (data, etag).
+
+    Results are cached per key for the whole process and revalidated with the
+    stored ETag once older than ttl seconds (JSON_CACHE_TTL by default). The
+    returned object is shared between sessions and must not be mutated. The
+    ETag is None when the file does not exist. With cache=False a fresh read
+    is not added to the cache, for one-off bulk reads.
+
+    Failed reads fall back to the cached copy, or to empty data. With
+    raise_errors they raise S3ReadError instead of returning empty data, so a
+    None ETag always means the file is missing.
+    """
+    s3_key = f"{S3_FOLDER}{file_name}"
+    ttl = _json_cache_ttl() if ttl is None else ttl
+
+    with _json_cache_lock:
+        cached = _json_cache.get(s3_key)
+    if cached and time.monotonic() - cached["checked"] < ttl:
+        return cached["data"], cached["etag"]
+
+    request = {"Bucket": get_bucket_name(), "Key": s3_key}
+    if cached and cached["etag"]:
+        request["IfNoneMatch"] = cached["etag"]
+
+    try:
+        response = get_s3_client().get_object(**request)
+        data = json.loads(response["Body"].read().decode("utf-8"))
+        if cache:
+            _cache_json(s3_key, data, response.get("ETag"))
+        return data, response.get("ETag")
+    except ClientError as e:
+        if cached and _is_not_modified(e):
+            with _json_cache_lock:
+                cached["checked"] = time.monotonic()
+            return cached["data"], cached["etag"]
+        if e.response['Error']['Code'] == 'NoSuchKey':
+            # File doesn't exist (anymore), return empty data
+            invalidate_json_cache(file_name)
+            return _empty_json(file_name), None
+        if cached:
+            return cached["data"], cached["etag"]
+        if raise_errors:
+            raise S3ReadError(f"Error reading {file_name} from S3") from e
+        return _empty_json(file_name), None
+    except Exception as e:
+        if cached:
+            return cached["data"], cached["etag"]
+        if raise_errors:
+            raise S3ReadError(f"Error reading {file_name} from S3") from e
+        return _empty_json(file_name), None
+
+def read_json_from_s3(file_name, ttl=None, cache=True):
+    """Read and parse a JSON file from S3 through the process-wide cache."""
+    data, _ = read_json_with_etag(file_name, ttl=ttl, cache=cache)
+    return data
+
+def _put_json(file_name, data, indent=4, if_match=None, if_none_match=False):
+    """Serialize and put a JSON file, raising ClientError on failure."""
+    s3_key = f"{S3_FOLDER}{file_name}"
+    if indent is None:
+        body = json.dumps(data, separators=(",", ":"))
+    else:
+        body = json.dumps(data, indent=indent)
+
+    request = {"Bucket": get_bucket_name(), "Key": s3_key, "Body": body}
+    if if_match:
+        request["IfMatch"] = if_match
+    elif if_none_match:
+        request["IfNoneMatch"] = "*"
+
+    response = get_s3_client().put_object(**request)
+    # Cache a private copy so later changes by the caller never leak to readers
+    _cache_json(s3_key, copy.deepcopy(data), response.get("ETag"))
+
+def write_json_to_s3(file_name, data, indent=4, if_match=None, if_none_match=False):
+    """Write JSON data to an S3 file. Pass indent=None for compact output.
+
+    With if_match the put only succeeds while the object still has that ETag;
+    with if_none_match it only succeeds if the object does not exist yet.
+    """
+    try:
+        _put_json(file_name, data, indent, if_match, if_none_match)
+        return True
+    except ClientError as e:
+        if not _is_write_conflict(e):
+            report_error(f"Error writing {file_name} to S3")
+        return False
+    except Exception:
+        report_error(f"Error writing {file_name} to S3")
+        return False
+
+def update_json_in_s3(file_name, update, indent=4, retries=CONDITIONAL_WRITE_RETRIES):
+    """Apply update to a JSON file with an optimistic conditional write.
+
+    update receives a private copy of the current data and returns the new data,
+    or None to skip the write. When another writer got there first the file is
+    re-read and update is applied again, so it must merge its own change into
+    whatever it is given. Gives up after retries conflicts.
+    """
+    ttl = None
+    for attempt in range(retries + 1):
+        current, etag = read_json_with_etag(file_name, ttl=ttl)
+        data = update(copy.deepcopy(current))
+        if data is None:
+            return True
+
+        try:
+            _put_json(file_name, data, indent, if_match=etag, if_none_match=etag is None)
+            return True
+        except ClientError as e:
+            if not _is_write_conflict(e):
+                report_error(f"Error writing {file_name} to S3")
+                return False
+        except Exception:
+            report_error(f"Error writing {file_name} to S3")
+            return False
+
+        # Lost the race: back off with jitter and merge into a fresh read
+        ttl = 0
+        time.sleep(random.uniform(0, CONDITIONAL_WRITE_BACKOFF * (2 ** attempt)))
+
+    report_error(f"Too many concurrent updates to {file_name}. Please try again.")
+    return False
+
+def upload_file(file_path, target_filename=None, bucket=None):
+    """Upload a file to an S3 bucket."""
+    bucket = bucket or get_bucket_name()
+    key = f"{get_documents_prefix()}{target_filename if target_filename else os.path.basename(file_path)}"
+    
+    try:
+        with open(file_path, 'rb') as file_data:
+            get_s3_client().upload_fileobj(file_data, bucket, key)
+        invalidate_document_index()
+        return True
+    except FileNotFoundError:
+        return False
+    except Exception:
+        return False
+
+class BufferReader(io.RawIOBase):
+    """Read-only, seekable file object over a bytes-like buffer.
+
+    Reads copy only the requested range out of a memoryview, so the buffer
+    itself is never duplicated.
+    """
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast("B")
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, target):
+        size = min(len(target), len(self._view) - self._position)
+        if size <= 0:
+            return 0
+        target[:size] = self._view[self._position:self._position + size]
+        self._position += size
+        return size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = max(0, offset)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+def upload_buffer(buffer, target_filename, bucket=None):
+    """Upload a bytes-like buffer (bytes, memoryview) to S3 without a temp file."""
+    bucket = bucket or get_bucket_name()
+    key = f"{get_documents_prefix()}{target_filename}"
+
+    try:
+        get_s3_client().upload_fileobj(BufferReader(buffer), bucket, key, Config=_get_transfer_config())
+        invalidate_document_index()
+        return True
+    except Exception:
+        return False
+
+def _paginate(bucket, prefix, delimiter=None):
+    """Yield every page of a list_objects_v2 listing."""
+    paginator = get_s3_client().get_paginator("list_objects_v2")
+    params = {"Bucket": bucket, "Prefix": prefix}
+    if delimiter:
+        params["Delimiter"] = delimiter
+    yield from paginator.paginate(**params)
+
+def _list_objects(bucket, prefix):
+    """List every object under a prefix, following continuation tokens."""
+    objects = []
+    for page in _paginate(bucket, prefix):
+        objects.extend(page.get("Contents", []))
+    return objects
+
+def _list_objects_sharded(bucket, prefix):
+    """List a prefix by fanning out over its top-level sub-prefixes in parallel."""
+    objects = []
+    shards = []
+    for page in _paginate(bucket, prefix, delimiter="/"):
+        objects.extend(page.get("Contents", []))
+        for common_prefix in page.get("CommonPrefixes", []):
+            # Skip the json-db/ folder entirely instead of filtering its keys
+            if common_prefix["Prefix"] != S3_FOLDER:
+                shards.append(common_prefix["Prefix"])
+
+    if shards:
+        with ThreadPoolExecutor(max_workers=min(LISTING_WORKERS, len(shards))) as executor:
+            for shard_objects in executor.map(lambda shard: _list_objects(bucket, shard), shards):
+                objects.extend(shard_objects)
+    return objects
+
+def _refresh_document_index(index, objects):
+    """Apply a fresh listing to an index, touching only changed entries."""
+    seen = set()
+    for obj in objects:
+        key = obj["Key"]
+        if key.startswith(S3_FOLDER) or key.endswith("/"):
+            continue
+        seen.add(key)
+        last_modified = obj["LastModified"].isoformat()
+        entry = index.get(key)
+        if entry is None or entry["lastModified"] != last_modified:
+            index[key] = {
+                "name": os.path.basename(key),
+                "key": key,
+                "size": obj.get("Size", 0),
+                "lastModified": last_modified,
+            }
+    for key in [key for key in index if key not in seen]:
+        del index[key]
+
+def invalidate_document_index():
+    """Force the next document listing to go back to S3."""
+    with _document_index_lock:
+        for state in _document_index.values():
+            state["refreshed"] = 0.0
+
+def list_file_objects(prefix=None, bucket=None, max_age=None):
+    """List documents in an S3 bucket with their size and LastModified.
+
+    Listings are paginated, skip the json-db/ folder, and are kept in a
+    per-process index that is reused for max_age seconds (LISTING_TTL by
+    default) and then refreshed in place from the objects' LastModified.
+    Raises if the bucket cannot be listed.
+    """
+    bucket = bucket or get_bucket_name()
+    prefix = get_documents_prefix() if prefix is None else prefix
+    max_age = LISTING_TTL if max_age is None else max_age
+
+    with _document_index_lock:
+        state = _document_index.setdefault((bucket, prefix), {"index": {}, "refreshed": 0.0})
+        if time.monotonic() - state["refreshed"] < max_age:
+            return list(state["index"].values())
+
+    # Errors propagate: an empty or outdated index must not pass for a listing
+    objects = _list_objects_sharded(bucket, prefix)
+    with _document_index_lock:
+        _refresh_document_index(state["index"], objects)
+        state["refreshed"] = time.monotonic()
+        return list(state["index"].values())
+
+def list_files(prefix=None, bucket=None):
+    """List all file names in an S3 bucket, excluding json-db/ folder files."""
+    return [obj["name"] for obj in list_file_objects(prefix=prefix, bucket=bucket)]
+
+def file_exists(file_name, bucket=None):
+    """Check if a document exists in an S3 bucket, under the documents prefix."""
+    try:
+        get_s3_client().head_object(Bucket=bucket or get_bucket_name(), Key=f"{get_documents_prefix()}{file_name}")
+        return True
+    except ClientError:
+        return False
+    
+def get_all_tags_from_list(questions_dict):
+    """Get all unique tags from the questions dictionary."""
+    if questions_dict is None or not isinstance(questions_dict, dict):
+        return []
+        
+    all_tags = set()
+    
+    # Iterate through the dictionary values (question data)
+    for question_id, question_data in questions_dict.items():
+        if "tags" in question_data and question_data["tags"]:
+            for tag in question_data["tags"]:
+                all_tags.add(tag)
+                
+    return sorted(list(all_tags))
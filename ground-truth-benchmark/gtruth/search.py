@@ -0,0 +1,200 @@
+import math
+import re
+import threading
+
+from collections import Counter
+
+from gtruth.s3 import read_json_from_s3, write_json_to_s3
+
+SEARCH_INDEX_FILE = "search_index.json"
+# Persist a new snapshot once this many questions were indexed since the last one
+SNAPSHOT_MIN_CHANGES = 25
+BM25_K1 = 1.2
+BM25_B = 0.75
+FACET_FIELDS = ("agent", "tags", "documents", "submitted_by")
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def tokenize(text):
+    """Lower-case word tokens of a string."""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+def _question_terms(entry):
+    """Tokens of every searchable field of a question entry."""
+    terms = tokenize(entry.get("question", ""))
+    terms += tokenize(entry.get("agent_name", ""))
+    for tag in entry.get("tags", []):
+        terms += tokenize(tag)
+    for pa in entry.get("partial_answers", []):
+        terms += tokenize(pa.get("answer", ""))
+        for ref in pa.get("references", []):
+            terms += tokenize(ref.get("document", ""))
+    return terms
+
+def _question_facets(entry):
+    documents = {
+        ref.get("document", "")
+        for pa in entry.get("partial_answers", [])
+        for ref in pa.get("references", [])
+        if ref.get("document")
+    }
+    return {
+        "agent": [entry.get("agent_name", "")],
+        "tags": list(entry.get("tags", [])),
+        "documents": sorted(documents),
+        "submitted_by": [entry.get("submitted_by", "Unknown")],
+    }
+
+
+class SearchIndex:
+    """In-memory inverted index over questions with BM25 ranking and facets."""
+
+    def __init__(self):
+        self.postings = {}  # term -> {question_id: term frequency}
+        self.terms = {}  # question_id -> distinct terms, so removal only visits its postings
+        self.lengths = {}  # question_id -> number of tokens
+        self.facets = {}  # question_id -> {facet field: [values]}
+        self.total_length = 0
+        self.version = None
+        self.unsaved_changes = 0
+
+    def __contains__(self, question_id):
+        return question_id in self.lengths
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, question_id, entry):
+        """Index one question; re-adding an indexed question replaces it."""
+        if question_id in self:
+            self.remove(question_id)
+
+        terms = Counter(_question_terms(entry))
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[question_id] = frequency
+        self.terms[question_id] = list(terms)
+        length = sum(terms.values())
+        self.lengths[question_id] = length
+        self.total_length += length
+        self.facets[question_id] = _question_facets(entry)
+        self.unsaved_changes += 1
+
+    def remove(self, question_id):
+        """Drop one question from the index."""
+        if question_id not in self:
+            return
+        for term in self.terms.pop(question_id, ()):
+            postings = self.postings.get(term, {})
+            if postings.pop(question_id, None) is not None and not postings:
+                del self.postings[term]
+        self.total_length -= self.lengths.pop(question_id)
+        self.facets.pop(question_id, None)
+        self.unsaved_changes += 1
+
+    def sync(self, questions):
+        """Index questions that are new and drop ones that are gone."""
+        for question_id in [q for q in self.lengths if q not in questions]:
+            self.remove(question_id)
+        for question_id, entry in questions.items():
+            if question_id not in self:
+                self.add(question_id, entry)
+
+    def search(self, query, limit=None):
+        """Rank questions for a query with BM25; returns [(question_id, score)]."""
+        if not self.lengths:
+            return []
+
+        document_count = len(self.lengths)
+        average_length = self.total_length / document_count or 1
+        scores = Counter()
+
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (document_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for question_id, frequency in postings.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[question_id] / average_length)
+                scores[question_id] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+        return scores.most_common(limit)
+
+    def facet_counts(self, question_ids=None):
+        """Count facet values (agent, tags, documents, submitter) over some questions."""
+        if question_ids is None:
+            question_ids = self.facets
+        counts = {field: Counter() for field in FACET_FIELDS}
+        for question_id in question_ids:
+            for field, values in self.facets.get(question_id, {}).items():
+                counts[field].update(values)
+        return counts
+
+    def to_dict(self):
+        """Snapshot of the index that later changes to it do not affect."""
+        return {
+            "version": self.version,
+            "postings": {term: dict(postings) for term, postings in self.postings.items()},
+            "lengths": dict(self.lengths),
+            "facets": {question_id: dict(facets) for question_id, facets in self.facets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls()
+        index.version = data.get("version")
+        index.postings = {term: dict(postings) for term, postings in data.get("postings", {}).items()}
+        index.lengths = dict(data.get("lengths", {}))
+        index.facets = dict(data.get("facets", {}))
+        index.total_length = sum(index.lengths.values())
+        for term, postings in index.postings.items():
+            for question_id in postings:
+                index.terms.setdefault(question_id, []).append(term)
+        return index
+
+
+def _load_snapshot():
+    """Load the persisted index snapshot, or an empty index if there is none."""
+    snapshot = read_json_from_s3(SEARCH_INDEX_FILE)
+    if isinstance(snapshot, dict) and "postings" in snapshot:
+        return SearchIndex.from_dict(snapshot)
+    return SearchIndex()
+
+def _save_snapshot(index):
+    if write_json_to_s3(SEARCH_INDEX_FILE, index.to_dict(), indent=None):
+        index.unsaved_changes = 0
+
+def get_search_index(questions, version):
+    """Return the process-wide search index brought up to date with questions.
+
+    A cold process starts from the persisted snapshot and only tokenizes the
+    questions added since it was written; a new snapshot is saved once
+    SNAPSHOT_MIN_CHANGES questions have been indexed since the last one.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = _load_snapshot()
+        if _index.version != version:
+            _index.sync(questions)
+            _index.version = version
+            if _index.unsaved_changes >= SNAPSHOT_MIN_CHANGES:
+                _save_snapshot(_index)
+        return _index
+
+def index_question(question_id, entry):
+    """Add a newly submitted question to the in-memory index."""
+    with _index_lock:
+        if _index is not None:
+            _index.add(question_id, entry)
+
+def search_questions(questions, version, query, limit=None):
+    """Search the questions; returns ([(question_id, score)], facet counts of the hits)."""
+    index = get_search_index(questions, version)
+    with _index_lock:
+        hits = index.search(query, limit=limit)
+        facets = index.facet_counts(question_id for question_id, _ in hits)
+    return hits, facets
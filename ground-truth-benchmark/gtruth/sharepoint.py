@@ -0,0 +1,503 @@
+import copy
+import threading
+import time
+
+from gtruth.config import get_setting
+from gtruth.graph import graph_get, graph_request
+from gtruth.references import get_reference_index
+from gtruth.s3 import read_json_from_s3, write_json_to_s3
+
+# Const
+GRAPH_API_BASE_URL = "https://graph.microsoft.com/v1.0"
+EVAL_BENCHMARK_PATH = "/Eval Benchmark"
+SHAREPOINT_FOLDER = "/sites/qlytics.sharepoint.com:/sites/AmpliforceHQ"
+DELTA_STATE_FILE = "sharepoint_delta.json"
+
+# Graph only accepts single-request uploads up to 4 MB
+SIMPLE_UPLOAD_LIMIT = 4 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 10 * 320 * 1024  # upload session chunks must be multiples of 320 KiB
+UPLOAD_CHUNK_RETRIES = 3
+
+# Delta link and item index per drive, persisted to S3 between processes
+_delta_state = {}
+_delta_lock = threading.Lock()
+
+# App-only Graph credentials shared by every session in the process
+TOKEN_REFRESH_MARGIN = 300  # refresh in the background this long before expiry
+TOKEN_MIN_VALIDITY = 60  # refresh inline if less than this is left
+TOKEN_RETRY_INTERVAL = 30
+_credentials = {"token": None, "expires_at": 0.0, "site_id": None, "settings": None, "refreshing": False}
+_credentials_lock = threading.Lock()
+_credentials_changed = threading.Condition(_credentials_lock)
+_refresh_timer = None
+
+# Documents drive and Eval Benchmark folder, resolved once per process
+_location = {"drive_id": None, "folder_id": None}
+_location_lock = threading.Lock()
+
+def _request_access_token(tenant_id, client_id, client_secret):
+    """Requests a client-credentials token and returns the raw token response"""
+    token_url = f"https://login.microsoftonline.com/{tenant_id}/oauth2/v2.0/token"
+    
+    data = {
+        "grant_type": "client_credentials",
+        "client_id": client_id,
+        "client_secret": client_secret,
+        "scope": "https://graph.microsoft.com/.default"
+    }
+    response = graph_request("POST", token_url, data=data)
+    return response.json()
+
+def get_access_token(tenant_id, client_id, client_secret):
+    """Get OAuth Token from Microsoft"""
+    token_json = _request_access_token(tenant_id, client_id, client_secret)
+
+    if "access_token" not in token_json:
+        return None
+
+    return token_json["access_token"]
+
+def _fetch_credentials(site_id):
+    """Fetches a new app token, and the site ID if it is not known yet.
+
+    Returns the fields to store in _credentials, or None on failure.
+    """
+    if _credentials["settings"] is None:
+        _credentials["settings"] = tuple(get_setting("azure", key) for key in ("TENANT_ID", "CLIENT_ID", "CLIENT_SECRET"))
+
+    token_json = _request_access_token(*_credentials["settings"])
+    if "access_token" not in token_json:
+        return None
+
+    expires_in = int(token_json.get("expires_in", 3599))
+    token = token_json["access_token"]
+    return {
+        "token": token,
+        "expires_at": time.time() + expires_in,
+        "site_id": site_id or get_site_id(token),
+    }
+
+def _refresh_credentials():
+    """Refreshes the shared credentials without holding the lock.
+
+    Only the thread that set _credentials["refreshing"] calls this; other
+    callers keep using the current token meanwhile.
+    """
+    with _credentials_lock:
+        site_id = _credentials["site_id"]
+    try:
+        fetched = _fetch_credentials(site_id)
+    except Exception:
+        fetched = None
+
+    with _credentials_changed:
+        if fetched:
+            _credentials.update(fetched)
+        _credentials["refreshing"] = False
+        _credentials_changed.notify_all()
+        expires_in = _credentials["expires_at"] - time.time()
+
+    # Keep the current token and try again shortly after a failure
+    _schedule_refresh(expires_in - TOKEN_REFRESH_MARGIN if fetched else TOKEN_RETRY_INTERVAL)
+
+def _schedule_refresh(delay):
+    """Refreshes the shared token in the background after delay seconds"""
+    global _refresh_timer
+    with _credentials_lock:
+        if _refresh_timer is not None:
+            _refresh_timer.cancel()
+        _refresh_timer = threading.Timer(max(delay, TOKEN_RETRY_INTERVAL), _background_refresh)
+        _refresh_timer.daemon = True
+        _refresh_timer.start()
+
+def _background_refresh():
+    with _credentials_lock:
+        if _credentials["refreshing"]:
+            return  # a session is already refreshing and will reschedule
+        _credentials["refreshing"] = True
+    _refresh_credentials()
+
+def _usable_credentials():
+    """Returns (token, site_id) if the token has not expired yet. Caller holds the lock."""
+    if _credentials["token"] and _credentials["site_id"] and time.time() < _credentials["expires_at"]:
+        return _credentials["token"], _credentials["site_id"]
+    return None, None
+
+def get_graph_credentials():
+    """Returns the (token, site_id) pair shared by every session in the process.
+
+    The app-only token is fetched once and refreshed in the background before
+    it expires, so callers normally get it without any network round trip.
+    When a refresh is due, one caller performs it and the others keep using
+    the current token until it really expires; only callers with no usable
+    token wait for the refresh. Returns (None, None) if no valid token can be
+    obtained.
+    """
+    with _credentials_changed:
+        token, site_id = _usable_credentials()
+        if token and time.time() < _credentials["expires_at"] - TOKEN_MIN_VALIDITY:
+            return token, site_id
+
+        if _credentials["refreshing"]:
+            if not token:
+                _credentials_changed.wait_for(lambda: not _credentials["refreshing"])
+                token, site_id = _usable_credentials()
+            return token, site_id
+        _credentials["refreshing"] = True
+
+    _refresh_credentials()
+    with _credentials_lock:
+        return _usable_credentials()
+
+def get_site_id(token):
+    """Get SharePoint Site ID"""
+    site_url = f"{GRAPH_API_BASE_URL}/sites/qlytics.sharepoint.com:/sites/AmpliforceHQ"
+
+    response = graph_get(site_url, token=token)
+    site_info = response.json()
+
+    if "id" not in site_info:
+        return None
+
+    return site_info["id"]
+
+def get_document_libraries(token, site_id):
+    """Returns a list of document libraries from SharePoint"""
+    url = f"{GRAPH_API_BASE_URL}/sites/{site_id}/drives"
+    response = graph_get(url, token=token)
+    libraries = response.json()
+
+    if "value" not in libraries:
+        return None
+
+    return libraries["value"]
+
+def _find_documents_drive_id(token, site_id):
+    """Returns the ID of the site's Documents library"""
+    for lib in get_document_libraries(token, site_id) or []:
+        if "document" in lib["name"].lower():
+            return lib["id"]
+    return None
+
+def _get_eval_benchmark_folder_id(token, drive_id, create=False):
+    """Returns (item ID of the Eval Benchmark folder, whether it exists).
+
+    With create a missing folder is created. The ID is None on failure, and
+    when the folder does not exist and create is not set.
+    """
+    url = f"{GRAPH_API_BASE_URL}/drives/{drive_id}/root:{EVAL_BENCHMARK_PATH}"
+    response = graph_get(url, token=token)
+
+    if response.status_code == 200:
+        return response.json().get("id"), True
+    if response.status_code != 404:
+        return None, True
+    if not create:
+        return None, False
+
+    create_folder_url = f"{GRAPH_API_BASE_URL}/drives/{drive_id}/root/children"
+    create_folder_data = {
+        "name": EVAL_BENCHMARK_PATH.strip("/"),
+        "folder": {},
+        "@microsoft.graph.conflictBehavior": "fail"
+    }
+    create_response = graph_request("POST", create_folder_url, token=token, json=create_folder_data)
+    if create_response.status_code in (200, 201):
+        return create_response.json().get("id"), True
+    if create_response.status_code == 409:
+        # Created concurrently by another session
+        response = graph_get(url, token=token)
+        if response.status_code == 200:
+            return response.json().get("id"), True
+    return None, True
+
+def resolve_eval_benchmark(token=None, site_id=None, create=False):
+    """Returns (drive_id, folder_id) of the Eval Benchmark folder.
+
+    Resolved once per process; call invalidate_eval_benchmark after a 404 so
+    the next call looks them up again. Returns (None, None) on failure and
+    (drive_id, None) if the folder does not exist; only with create (the
+    upload path) is a missing folder created.
+    """
+    with _location_lock:
+        if _location["drive_id"] and _location["folder_id"]:
+            return _location["drive_id"], _location["folder_id"]
+
+        if not token or not site_id:
+            token, site_id = get_graph_credentials()
+        if not token or not site_id:
+            return None, None
+
+        drive_id = _find_documents_drive_id(token, site_id)
+        if not drive_id:
+            return None, None
+        folder_id, exists = _get_eval_benchmark_folder_id(token, drive_id, create)
+        if not folder_id:
+            return (None, None) if exists else (drive_id, None)
+
+        _location.update(drive_id=drive_id, folder_id=folder_id)
+        return drive_id, folder_id
+
+def invalidate_eval_benchmark():
+    """Forgets the resolved drive and folder IDs"""
+    with _location_lock:
+        _location.update(drive_id=None, folder_id=None)
+
+def _compact_item(item):
+    """Keeps only the driveItem fields the app uses"""
+    compact = {
+        "id": item["id"],
+        "name": item.get("name", ""),
+        "size": item.get("size", 0),
+        "lastModifiedDateTime": item.get("lastModifiedDateTime", ""),
+        "createdBy": item.get("createdBy", {}),
+    }
+    if "folder" in item:
+        compact["folder"] = item["folder"]
+    if "file" in item:
+        compact["file"] = item["file"]
+    return compact
+
+def _fetch_delta(token, url):
+    """Follows a delta query through every page.
+
+    Returns (changed items, new delta link), or (None, None) if the delta link
+    has expired and a full resync is required.
+    """
+    items = []
+
+    while url:
+        response = graph_get(url, token=token)
+        if response.status_code == 410:
+            return None, None
+        if response.status_code == 404:
+            # Drive is gone; resolve it again on the next call
+            invalidate_eval_benchmark()
+        response.raise_for_status()
+
+        page = response.json()
+        items.extend(page.get("value", []))
+        if "@odata.deltaLink" in page:
+            return items, page["@odata.deltaLink"]
+        url = page.get("@odata.nextLink")
+
+    return items, None
+
+def _load_delta_state(drive_id):
+    """Returns the delta state for a drive from memory, falling back to S3"""
+    state = _delta_state.get(drive_id)
+    if state is None:
+        stored = read_json_from_s3(DELTA_STATE_FILE)
+        if isinstance(stored, dict) and stored.get("drive_id") == drive_id:
+            # Private copy: the cached object is shared and must not be mutated
+            state = copy.deepcopy(stored)
+        else:
+            state = {"drive_id": drive_id, "folder_id": None, "delta_link": None, "items": {}}
+        _delta_state[drive_id] = state
+    return state
+
+def sync_eval_benchmark(token, drive_id=None):
+    """Brings the local Eval Benchmark index up to date with a delta query.
+
+    The first sync pages through the whole drive; afterwards the stored delta
+    link returns only the items that changed. Delta queries are only supported
+    on the drive root in SharePoint, so changes are filtered to the folder.
+    Raises if the folder or the delta query cannot be resolved, so a failed
+    listing is never mistaken for an empty folder.
+    """
+    resolved_drive_id, folder_id = resolve_eval_benchmark(token)
+    if not resolved_drive_id:
+        raise RuntimeError("Could not resolve the Eval Benchmark folder")
+    if not folder_id:
+        return []  # the folder has not been created yet
+    drive_id = drive_id or resolved_drive_id
+
+    with _delta_lock:
+        state = _load_delta_state(drive_id)
+        if state["folder_id"] != folder_id:
+            # Folder was recreated: the stored index belongs to the old one
+            state.update(folder_id=folder_id, delta_link=None, items={})
+
+        root_url = f"{GRAPH_API_BASE_URL}/drives/{drive_id}/root/delta"
+        full_sync = not state["delta_link"]
+        if full_sync:
+            # A sync from the root lists every item, so items missing from it are gone
+            state["items"] = {}
+        changes, delta_link = _fetch_delta(token, state["delta_link"] or root_url)
+        if changes is None:
+            # Delta link expired: start over with a full sync
+            full_sync = True
+            state["items"] = {}
+            changes, delta_link = _fetch_delta(token, root_url)
+
+        items = state["items"]
+        for item in changes or []:
+            parent_id = item.get("parentReference", {}).get("id")
+            if "deleted" in item or parent_id != state["folder_id"]:
+                items.pop(item["id"], None)
+            else:
+                items[item["id"]] = _compact_item(item)
+
+        state["delta_link"] = delta_link
+        if changes or full_sync:
+            write_json_to_s3(DELTA_STATE_FILE, state, indent=None)
+
+        return list(items.values())
+
+def get_file_item(token, drive_id, file_name):
+    """Gets a specific file from the Eval Benchmark folder"""
+    resolved_drive_id, folder_id = resolve_eval_benchmark(token)
+    if not folder_id:
+        return None
+    url = f"{GRAPH_API_BASE_URL}/drives/{drive_id or resolved_drive_id}/items/{folder_id}:/{file_name}"
+    
+    try:
+        response = graph_get(url, token=token)
+        
+        if response.status_code == 200:
+            return response.json()
+        
+        return None
+    except Exception:
+        return None
+
+def _create_upload_session(token, drive_id, folder_id, file_name):
+    """Starts a resumable upload session and returns its upload URL"""
+    url = f"{GRAPH_API_BASE_URL}/drives/{drive_id}/items/{folder_id}:/{file_name}:/createUploadSession"
+    body = {"item": {"@microsoft.graph.conflictBehavior": "replace"}}
+    response = graph_request("POST", url, token=token, json=body)
+
+    if response.status_code == 404:
+        invalidate_eval_benchmark()
+    if response.status_code != 200:
+        return None
+
+    return response.json().get("uploadUrl")
+
+def _next_expected_offset(upload_url):
+    """Asks the upload session which byte it expects next (None if it is gone)"""
+    # The upload URL is pre-authenticated; sending a bearer token breaks it
+    response = graph_get(upload_url)
+    if response.status_code != 200:
+        return None
+
+    ranges = response.json().get("nextExpectedRanges", [])
+    if not ranges:
+        return None
+    return int(ranges[0].split("-")[0])
+
+def _upload_in_chunks(upload_url, file_content):
+    """Sends a file to an upload session in fixed-size chunks.
+
+    Graph requires the chunks of one session to arrive in order, so they are
+    sent sequentially. A chunk that fails, or that the server accepts without
+    moving its expected offset forward, is retried from the range the server
+    reports it still needs, up to UPLOAD_CHUNK_RETRIES times in a row; the
+    session is then deleted.
+    """
+    view = memoryview(file_content)
+    total = len(view)
+    offset = 0
+    failures = 0
+
+    while offset < total:
+        end = min(offset + UPLOAD_CHUNK_SIZE, total)
+        headers = {
+            "Content-Length": str(end - offset),
+            "Content-Range": f"bytes {offset}-{end - 1}/{total}"
+        }
+        try:
+            response = graph_request("PUT", upload_url, headers=headers, data=bytes(view[offset:end]))
+        except Exception:
+            response = None
+
+        if response is not None and response.status_code in (200, 201):
+            return True
+        if response is not None and response.status_code == 202:
+            ranges = response.json().get("nextExpectedRanges", [])
+            next_offset = int(ranges[0].split("-")[0]) if ranges else end
+            if next_offset > offset:
+                offset = next_offset
+                failures = 0
+                continue
+            # Accepted without progress: count it like a failed chunk
+            failures += 1
+            if failures > UPLOAD_CHUNK_RETRIES:
+                break
+            offset = next_offset
+            continue
+
+        failures += 1
+        if failures > UPLOAD_CHUNK_RETRIES:
+            break
+        # Resume from wherever the server actually got to
+        next_offset = _next_expected_offset(upload_url)
+        if next_offset is None:
+            break
+        offset = next_offset
+
+    try:
+        graph_request("DELETE", upload_url)
+    except Exception:
+        pass
+    return False
+
+def upload_to_eval_benchmark(token, site_id, file_name, file_content):
+    """Uploads a file to the Eval Benchmark folder in SharePoint
+
+    Files above SIMPLE_UPLOAD_LIMIT go through a resumable upload session.
+    """
+    upload_headers = {"Content-Type": "application/octet-stream"}
+    file_content = memoryview(file_content)
+
+    if len(file_content) > SIMPLE_UPLOAD_LIMIT:
+        drive_id, folder_id = resolve_eval_benchmark(token, site_id, create=True)
+        if not folder_id:
+            return None
+
+        upload_url = _create_upload_session(token, drive_id, folder_id, file_name)
+        if not upload_url:
+            return False
+        return _upload_in_chunks(upload_url, file_content)
+
+    # A path PUT under the folder creates the file or replaces an existing one;
+    # requests cannot send a memoryview, so the (small) body is copied once
+    file_content = file_content.tobytes()
+    for _ in range(2):
+        drive_id, folder_id = resolve_eval_benchmark(token, site_id, create=True)
+        if not folder_id:
+            return None
+
+        upload_url = f"{GRAPH_API_BASE_URL}/drives/{drive_id}/items/{folder_id}:/{file_name}:/content"
+        response = graph_request("PUT", upload_url, token=token, headers=upload_headers, data=file_content)
+
+        if response.status_code in (200, 201):
+            return True
+        if response.status_code != 404:
+            return False
+
+        # Folder was moved or deleted since it was resolved
+        invalidate_eval_benchmark()
+
+    return False
+
+def get_all_documents_from_list(questions):
+    """Get all unique document names referenced by the questions.
+
+    Accepts the question store dict ({question_id: entry}) as well as the
+    legacy list of questions with "Reference Documents".
+    """
+    if isinstance(questions, dict):
+        return sorted(get_reference_index(questions, None).cited_documents())
+    if questions is None or not isinstance(questions, list):
+        return []
+        
+    all_documents = set()
+    
+    for question in questions:
+        if "Reference Documents" in question:
+            for doc in question["Reference Documents"]:
+                if "name" in doc and doc["name"]:
+                    all_documents.add(doc["name"])
+                
+    return sorted(list(all_documents))
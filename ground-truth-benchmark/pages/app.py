@@ -1,35 +1,51 @@
 import streamlit as st
 import pandas as pd
+import time
 import uuid
 
 from streamlit_option_menu import option_menu
 from utils import (
-    logout, get_document_libraries, 
-    get_files_from_storage, upload_to_storage, get_unique_filename,
+    logout, get_graph_credentials,
+    get_document_catalog, get_listing_status, upload_many_to_storage, get_unique_filenames,
+    compute_sha256_many, find_duplicate_uploads,
     add_partial_answer, remove_partial_answer, 
     add_reference_to_partial, remove_reference_from_partial,
     handle_new_tag
 )
-from utils.s3 import read_json_from_s3, write_json_to_s3, get_all_tags_from_list
+from utils.question_store import load_questions_with_version, save_question, load_facets
+from utils.s3 import S3ReadError
+from utils.search import search_questions, index_question
+from utils.references import get_reference_index, index_question_references
+from utils.importer import IMPORT_FORMATS, import_questions
+from utils.library import (
+    LIBRARY_PAGE_SIZES, DISPLAY_COLUMNS,
+    get_library_table, filter_library, paginate, format_question_detail
+)
 
 # Page configuration
 st.set_page_config(page_title="Ground Truth Benchmark", layout="wide", initial_sidebar_state="expanded")
 
-# Load questions from S3
-try:
-    QUESTIONS = read_json_from_s3("submitted_questions.json")
-    if QUESTIONS is None or not isinstance(QUESTIONS, dict):
-        QUESTIONS = {}
-        write_json_to_s3("submitted_questions.json", {})
-except Exception:
-    QUESTIONS = {}
-    write_json_to_s3("submitted_questions.json", {})
-
 # Authentication check
 if "authenticated" not in st.session_state or not st.session_state["authenticated"]:
     st.warning("Please log in first.")
     st.switch_page("pages/login.py")
 
+# Load questions from S3 (only for authenticated sessions)
+try:
+    QUESTIONS, QUESTIONS_VERSION = load_questions_with_version()
+except S3ReadError:
+    st.error("Part of the question library could not be read from S3. Please reload the page.")
+    QUESTIONS, QUESTIONS_VERSION = {}, None
+except Exception:
+    QUESTIONS, QUESTIONS_VERSION = {}, None
+
+def get_facets():
+    """Facet counts for the filters, or no counts while the index cannot be read."""
+    try:
+        return load_facets()
+    except S3ReadError:
+        return {"questions": 0, "tags": {}, "agents": {}, "submitters": {}}
+
 # CSS
 # Add this CSS styling to your existing st.markdown section
 st.markdown("""
@@ -93,6 +109,8 @@ with st.sidebar:
         st.session_state['option'] = "Add New Question"
     if st.button("View Questions"):
         st.session_state['option'] = "View Questions"
+    if st.button("Import Questions"):
+        st.session_state['option'] = "Import Questions"
     if st.button("View and Upload Documents"):
         st.session_state['option'] = "View and Upload Documents"    
     if st.sidebar.button("Logout"):
@@ -101,9 +119,8 @@ with st.sidebar:
 # Set default page           
 option = st.session_state.get('option', "Add New Question")
 
-# Get authentication tokens from session
-TOKEN = st.session_state.get("token")
-SITE_ID = st.session_state.get("site_id")
+# Get the shared SharePoint credentials (refreshed in the background)
+TOKEN, SITE_ID = get_graph_credentials()
 
 if not TOKEN or not SITE_ID:
     st.error("Authentication required. Please log in.")
@@ -135,24 +152,10 @@ else:
         question = st.text_area("Question", key="question_input")
         agent_name = st.text_input("Agent Name", key="agent_name_input", placeholder="e.g. SARA, RAFA, TESSA")
 
-        # Document selection section
-        libraries = get_document_libraries(TOKEN, SITE_ID)
-        drive_id = None
-        for lib in libraries:
-            if "document" in lib["name"].lower():
-                drive_id = lib["id"]
-                st.session_state["document_drive_id"] = drive_id
-                break
-                
-        # Get files
-        if 'all_files' not in st.session_state or st.session_state.get('refresh_files', False):
-            all_files = get_files_from_storage()
-            st.session_state['all_files'] = all_files
-            st.session_state['refresh_files'] = False
-        
-        all_files = st.session_state['all_files']
-        # Ensure unique filenames in dropdown regardless of storage source
-        available_files = list(set(file["name"] for file in all_files))
+        # Get files from the shared document catalog
+        catalog = get_document_catalog(force_refresh=st.session_state.get('refresh_files', False))
+        st.session_state['refresh_files'] = False
+        available_files = sorted(catalog)
 
         if not available_files:
             st.info("No files found. Upload files in the 'View and Upload Documents' section.")
@@ -228,7 +231,7 @@ else:
             st.rerun()
 
         # Tags section
-        existing_tags = get_all_tags_from_list(QUESTIONS)
+        existing_tags = sorted(get_facets()["tags"])
 
         if 'selected_tags' not in st.session_state:
             st.session_state['selected_tags'] = []
@@ -276,13 +279,7 @@ else:
                             continue  # Skip empty references
                             
                         # Find all sources where this file exists
-                        file_sources = []
-                        for file in st.session_state['all_files']:
-                            if file["name"] == ref["document"]:
-                                file_sources.append(file["source"])
-                                
-                        # Convert to a list of unique sources instead of a comma-separated string
-                        file_sources = sorted(set(file_sources)) if file_sources else ["Unknown"]
+                        file_sources = list(catalog.get(ref["document"], {}).get("sources", [])) or ["Unknown"]
                         
                         # Convert pages from comma-separated string to a list of strings
                         pages_list = [page.strip() for page in ref["pages"].split(",")] if ref["pages"].strip() else []
@@ -318,8 +315,12 @@ else:
                 }
 
                 # Add to database
+                if not save_question(question_id, new_entry):
+                    st.error("Failed to save the question. Please try again.")
+                    st.stop()
                 QUESTIONS[question_id] = new_entry
-                write_json_to_s3("submitted_questions.json", QUESTIONS)
+                index_question(question_id, new_entry)
+                index_question_references(question_id, new_entry)
                 
                 st.session_state['form_submitted'] = True
                 st.rerun()
@@ -329,52 +330,130 @@ else:
         st.header("Ground Truth Library")
 
         if QUESTIONS:
-            # Prepare data for display
-            data = []
-            
-            for question_id, question_data in QUESTIONS.items():
-                question_text = question_data.get("question", "")
-                agent_name = question_data.get("agent_name", "")
-                tags = ", ".join(question_data.get("tags", []))
-                created_on = question_data.get("created_on", "")
-                submitted_by = question_data.get("submitted_by", "Unknown")
-                
-                # Process all partial answers
-                partial_answers_display = []
-                for i, pa in enumerate(question_data.get("partial_answers", [])):
-                    answer_text = pa.get("answer", "")
-                    
-                    # Process references for this partial answer
-                    refs_display = []
-                    for ref in pa.get("references", []):
-                        doc_name = ref.get("document", "")
-                        pages = ref.get("page", [])
-                        sources = ref.get("source", ["Unknown"])
-                        
-                        pages_text = ", ".join(ref["page"]) if isinstance(ref["page"], list) else ref["page"]
-                        sources_text = ", ".join(ref["source"]) if isinstance(ref["source"], list) else ref["source"]
-                        
-                        refs_display.append(f"- {doc_name} (Pages: {pages_text}) [Source: {sources_text}]")
-                    
-                    refs_text = "\n".join(refs_display)
-                    partial_answers_display.append(f"Part. {i+1}: {answer_text}\n\nReferences:\n{refs_text}\n")
-                
-                all_answers = "\n\n".join(partial_answers_display)
-                
-                data.append({
-                    "Question": question_text,
-                    "Partial Answers": all_answers,
-                    "Agent Name": agent_name,
-                    "Tags": tags,
-                    "Created On": created_on,
-                    "Submitted By": submitted_by
-                })
-            
-            df = pd.DataFrame(data)
-            st.dataframe(df, width=3000, height=500)
+            table = get_library_table(QUESTIONS, QUESTIONS_VERSION)
+
+            # Column filters, with options and counts from the facet index
+            facets = get_facets()
+            filter_cols = st.columns(4)
+            with filter_cols[0]:
+                agent_filter = st.multiselect(
+                    "Agent", options=sorted(facets["agents"]),
+                    format_func=lambda agent: f"{agent} ({facets['agents'][agent]})"
+                )
+            with filter_cols[1]:
+                tag_filter = st.multiselect(
+                    "Tag", options=sorted(facets["tags"]),
+                    format_func=lambda tag: f"{tag} ({facets['tags'][tag]})"
+                )
+            with filter_cols[2]:
+                submitter_filter = st.multiselect(
+                    "Submitted By", options=sorted(facets["submitters"]),
+                    format_func=lambda submitter: f"{submitter} ({facets['submitters'][submitter]})"
+                )
+            with filter_cols[3]:
+                date_filter = st.date_input("Created Between", value=(), key="library_dates")
+
+            date_range = None
+            if date_filter:
+                date_range = (date_filter[0], date_filter[1] if len(date_filter) > 1 else None)
+
+            filtered = filter_library(
+                table,
+                agents=agent_filter,
+                tags=tag_filter,
+                submitters=submitter_filter,
+                date_range=date_range
+            )
+
+            # Full-text search over questions, answers, agents, tags and documents
+            search_query = st.text_input("Search", key="library_search", placeholder="Search questions and answers")
+            if search_query.strip():
+                hits, facets = search_questions(QUESTIONS, QUESTIONS_VERSION, search_query)
+                scores = dict(hits)
+                filtered = filtered[filtered["id"].isin(scores)]
+                filtered = filtered.assign(score=filtered["id"].map(scores)).sort_values("score", ascending=False)
+
+                top_agents = ", ".join(f"{name} ({count})" for name, count in facets["agent"].most_common(5))
+                top_tags = ", ".join(f"{name} ({count})" for name, count in facets["tags"].most_common(5))
+                if top_agents or top_tags:
+                    st.caption(f"Agents: {top_agents or '-'}  |  Tags: {top_tags or '-'}")
+
+            # Pagination
+            page_cols = st.columns([1, 1, 4])
+            with page_cols[0]:
+                page_size = st.selectbox("Rows per page", options=LIBRARY_PAGE_SIZES, index=1)
+            page_count = max(1, -(-len(filtered) // page_size))
+            with page_cols[1]:
+                page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+            with page_cols[2]:
+                st.caption(f"{len(filtered)} of {len(table)} questions - page {page} of {page_count}")
+
+            page_rows, _ = paginate(filtered, page, page_size)
+            st.dataframe(page_rows[DISPLAY_COLUMNS], width=3000, height=500, hide_index=True)
+
+            # Only the selected question's answers and references are rendered
+            if not page_rows.empty:
+                selected_id = st.selectbox(
+                    "Show answers for",
+                    options=[None] + list(page_rows["id"]),
+                    format_func=lambda question_id: "" if question_id is None else QUESTIONS[question_id].get("question", "")
+                )
+                if selected_id is not None:
+                    with st.expander("Partial Answers", expanded=True):
+                        st.markdown(format_question_detail(QUESTIONS[selected_id]))
         else:
             st.info("No questions found. Add new questions in the 'Add New Question' section.")
             
+    # BULK IMPORT PAGE
+    elif option == "Import Questions":
+        st.header("Import Questions")
+        st.markdown(
+            "Upload a **JSONL** file with one question per line in the same format as the form "
+            "(`question`, `agent_name`, `tags`, `partial_answers[].references[]`), or a **CSV** file "
+            "with the columns `question`, `agent_name`, `tags`, `answer`, `document`, `pages` and one row "
+            "per reference. Tags are separated by `;` and pages by `,`."
+        )
+
+        import_file = st.file_uploader("Choose a file", type=list(IMPORT_FORMATS))
+
+        if import_file is not None:
+            import_format = "csv" if import_file.name.lower().endswith(".csv") else "jsonl"
+            catalog = get_document_catalog()
+            validate_col, import_col = st.columns(2)
+
+            result = None
+            with validate_col:
+                if st.button("Validate"):
+                    with st.spinner("Validating..."):
+                        import_file.seek(0)
+                        result = import_questions(import_file, import_format, catalog=catalog, dry_run=True)
+            with import_col:
+                if st.button("Import"):
+                    with st.spinner("Importing..."):
+                        import_file.seek(0)
+                        result = import_questions(
+                            import_file,
+                            import_format,
+                            submitted_by=st.session_state.get("username", "Unknown"),
+                            catalog=catalog
+                        )
+
+            if result is not None:
+                if result["imported"] is None:
+                    st.error("Failed to save the imported questions. Please try again.")
+                elif result["imported"]:
+                    st.success(f"Imported {result['imported']} questions.")
+                else:
+                    st.info(f"{result['valid']} questions are valid.")
+
+                if result["errors"]:
+                    st.warning(f"{len(result['errors'])} problems found; those rows were skipped.")
+                    st.dataframe(
+                        pd.DataFrame(result["errors"], columns=["Line", "Error"]),
+                        hide_index=True,
+                        use_container_width=True
+                    )
+
     # DOCUMENT MANAGEMENT PAGE
     elif option == "View and Upload Documents":
         st.header("Document Management")
@@ -388,41 +467,58 @@ else:
 
         # FILE LIST PAGE
         if selected_page == "File List":
-            all_files = get_files_from_storage()
-
-            if all_files:
-                unique_files = {}
-
-                for file in all_files:
-                    filename = file["name"]
-                    modified_date = file.get("lastModified", "").split('T')[0] if "T" in file.get("lastModified", "") else file.get("lastModified", "")
-                    created_by = file.get("createdBy", "Unknown")
-                    source = file.get("source", "Unknown")
-
-                    # If file already exists, merge storage sources and prioritize SharePoint metadata
-                    if filename in unique_files:
-                        if file["source"] == "SharePoint":
-                            unique_files[filename].update({
-                                "Last Modified": modified_date,
-                                "Created By": created_by
-                            })
-                        # Add storage source to the list of sources
-                        if source not in unique_files[filename]["Storage"]:
-                            unique_files[filename]["Storage"] += f", {source}"
+            catalog = get_document_catalog(force_refresh=st.session_state.get('refresh_files', False))
+            st.session_state['refresh_files'] = False
+
+            for source, status in get_listing_status().items():
+                if status["error"]:
+                    listed_at = time.strftime("%H:%M", time.localtime(status["listedAt"])) if status["listedAt"] else None
+                    st.warning(
+                        f"{source} could not be listed ({status['error']}). "
+                        + (f"Showing its files as of {listed_at}." if listed_at else "Its files may be missing.")
+                    )
+
+            reference_index = get_reference_index(QUESTIONS, QUESTIONS_VERSION)
+            cited_counts = reference_index.cited_documents()
+
+            file_data = []
+            for filename, entry in sorted(catalog.items()):
+                file_data.append({
+                    "File Name": filename,
+                    "Last Modified": entry.get("lastModified", "").split('T')[0],
+                    "Created By": entry.get("createdBy", "Unknown"),
+                    "Storage": ", ".join(entry.get("sources", [])) or "Unknown",
+                    "Cited By": cited_counts.get(filename, 0)
+                })
+
+            if file_data:
+                df = pd.DataFrame(file_data)
+                st.table(df)
+
+                # Which answers cite a document (optionally a page range)
+                with st.expander("Find citations"):
+                    citation_cols = st.columns([3, 1, 1])
+                    with citation_cols[0]:
+                        cited_document = st.selectbox("Document", options=sorted(catalog), key="citation_document")
+                    with citation_cols[1]:
+                        first_page = st.number_input("From page", min_value=0, value=0, step=1)
+                    with citation_cols[2]:
+                        last_page = st.number_input("To page", min_value=0, value=0, step=1, help="0 = any page")
+
+                    citations = reference_index.citing(
+                        cited_document,
+                        first_page or None,
+                        last_page or None
+                    )
+                    if citations:
+                        for question_id, partial_index in citations:
+                            st.write(f"- {QUESTIONS[question_id].get('question', '')} (Part. {partial_index + 1})")
                     else:
-                        unique_files[filename] = {
-                            "File Name": filename,
-                            "Last Modified": modified_date,
-                            "Created By": created_by,
-                            "Storage": source
-                        }
-
-                file_data = list(unique_files.values())
-                if file_data:
-                    df = pd.DataFrame(file_data)
-                    st.table(df)
-                else:
-                    st.info("No files found. Use the 'Upload New File' tab to add files.")
+                        st.info("No answers cite this document.")
+
+                    unused = reference_index.unused_documents(catalog)
+                    if unused:
+                        st.caption(f"{len(unused)} documents are not cited by any question.")
             else:
                 st.info("No files found. Use the 'Upload New File' tab to add files.")
 
@@ -433,34 +529,52 @@ else:
             if uploaded_files:
                 files_to_upload = []
                 
+                # Resolve names once per selection instead of on every rerun
+                batch_key = tuple((f.name, f.size) for f in uploaded_files)
+                if st.session_state.get('upload_batch_key') != batch_key:
+                    st.session_state['upload_batch_key'] = batch_key
+                    st.session_state['upload_filenames'] = get_unique_filenames(
+                        [f.name for f in uploaded_files]
+                    )
+                    st.session_state['upload_hashes'] = compute_sha256_many(uploaded_files)
+                
+                upload_hashes = st.session_state['upload_hashes']
+                duplicates = find_duplicate_uploads(upload_hashes)
+                
                 # Preview files and show renamed info
                 st.subheader("Files Ready to Upload:")
-                for uploaded_file in uploaded_files:
-                    file_bytes = uploaded_file.getvalue()
+                for index, (uploaded_file, upload_filename) in enumerate(zip(uploaded_files, st.session_state['upload_filenames'])):
                     original_filename = uploaded_file.name
-                    upload_filename = get_unique_filename(original_filename)
                     
                     file_info = f"**{upload_filename}**"
-                    if upload_filename != original_filename:
+                    if duplicates[index] and duplicates[index][0]:
+                        file_info = f"**{original_filename}** (identical to existing file **{duplicates[index][0]}**; reference that name instead)"
+                    elif duplicates[index]:
+                        file_info = f"**{original_filename}** (identical to **{uploaded_files[duplicates[index][1]].name}** in this batch)"
+                    elif upload_filename != original_filename:
                         file_info += f" (renamed from {original_filename})"
                     
                     st.write(file_info)
-                    files_to_upload.append((upload_filename, file_bytes))
+                    files_to_upload.append((upload_filename, uploaded_file))
 
                 if st.button("Upload All Files"):
-                    with st.spinner(f"Uploading {len(files_to_upload)} files..."):
-                        successful_files = []
-                        failed_files = []
+                    progress_bar = st.progress(0.0, text=f"Uploading {len(files_to_upload)} files...")
+
+                    def show_progress(done, total, filename, upload_results):
+                        progress_bar.progress(done / total, text=f"Uploaded {done} of {total} files ({filename})")
+
+                    successful_files = []
+                    failed_files = []
+                    
+                    for filename, upload_results in upload_many_to_storage(files_to_upload, on_progress=show_progress, hashes=upload_hashes):
+                        successful_uploads = [storage for storage, result in upload_results if result]
+                        failed_uploads = [storage for storage, result in upload_results if not result]
                         
-                        for filename, file_bytes in files_to_upload:
-                            upload_results = upload_to_storage(filename, file_bytes)
-                            successful_uploads = [storage for storage, result in upload_results if result]
-                            failed_uploads = [storage for storage, result in upload_results if not result]
-                            
-                            if successful_uploads:
-                                successful_files.append((filename, successful_uploads))
-                            if failed_uploads:
-                                failed_files.append((filename, failed_uploads))
+                        if successful_uploads:
+                            successful_files.append((filename, successful_uploads))
+                        if failed_uploads:
+                            failed_files.append((filename, failed_uploads))
+                    progress_bar.empty()
                     
                     # Display upload summary
                     if len(successful_files) == len(files_to_upload):
@@ -481,4 +595,5 @@ else:
                     else:
                         st.error("All uploads failed. Please check your connection and try again.")
                     
-                    st.session_state['refresh_files'] = True
\ No newline at end of file
+                    st.session_state['refresh_files'] = True
+                    st.session_state.pop('upload_batch_key', None)
\ No newline at end of file
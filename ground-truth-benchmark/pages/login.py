@@ -1,6 +1,6 @@
 import streamlit as st
 
-from utils.sharepoint import get_access_token, get_site_id
+from utils.sharepoint import get_graph_credentials
 
 st.set_page_config(initial_sidebar_state="collapsed")
 
@@ -20,16 +20,9 @@ st.markdown(
 def authentication():
     """Authenticate using Microsoft Graph API"""
     try:
-        TENANT_ID = st.secrets["azure"]["TENANT_ID"]
-        CLIENT_ID = st.secrets["azure"]["CLIENT_ID"]
-        CLIENT_SECRET = st.secrets["azure"]["CLIENT_SECRET"]
-        
-        token = get_access_token(TENANT_ID, CLIENT_ID, CLIENT_SECRET)
-        if not token:
-            return None
-
-        site_id = get_site_id(token)
-        if not site_id:
+        # Shared by all sessions; only the first login in the process hits Microsoft
+        token, site_id = get_graph_credentials()
+        if not token or not site_id:
             return None
 
         st.session_state["token"] = token
@@ -0,0 +1,76 @@
+"""Startup budget: the login page imports utils and utils.auth before anything else.
+
+Each check runs in a fresh interpreter so modules imported by other tests do
+not hide what the import itself pulls in.
+"""
+import json
+import os
+import subprocess
+import sys
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_TIME_BUDGET = 1.0  # seconds for `import utils, utils.auth`
+DEFERRED_MODULES = ("pandas", "boto3")
+
+# Streamlit and bcrypt are stubbed so only this app's import cost is measured;
+# botocore is stubbed only where it is not installed.
+STARTUP_SCRIPT = """
+import importlib.util
+import json
+import sys
+import time
+import types
+
+streamlit = types.ModuleType("streamlit")
+streamlit.secrets = {
+    "aws": {"S3_BUCKET_NAME": "startup-test", "AWS_REGION": "us-east-1"},
+    "azure": {"TENANT_ID": "tenant", "CLIENT_ID": "client", "CLIENT_SECRET": "secret"},
+}
+streamlit.session_state = {}
+streamlit.error = lambda message: None
+sys.modules["streamlit"] = streamlit
+
+bcrypt = types.ModuleType("bcrypt")
+bcrypt.checkpw = lambda password, hashed: False
+sys.modules["bcrypt"] = bcrypt
+
+if importlib.util.find_spec("botocore") is None:
+    botocore = types.ModuleType("botocore")
+    botocore.exceptions = types.ModuleType("botocore.exceptions")
+    botocore.exceptions.ClientError = type("ClientError", (Exception,), {})
+    sys.modules["botocore"] = botocore
+    sys.modules["botocore.exceptions"] = botocore.exceptions
+
+started = time.perf_counter()
+import utils
+import utils.auth
+elapsed = time.perf_counter() - started
+
+import gtruth.s3
+
+print(json.dumps({
+    "elapsed": elapsed,
+    "modules": sorted(name for name in %r if name in sys.modules),
+    "s3_client_built": gtruth.s3._client["s3"] is not None,
+}))
+"""
+
+
+def _run_startup():
+    env = dict(os.environ, PYTHONPATH=APP_ROOT)
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT % (DEFERRED_MODULES,)],
+        cwd=APP_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_login_imports_defer_heavy_modules():
+    startup = _run_startup()
+    assert startup["modules"] == []
+    assert not startup["s3_client_built"]
+
+
+def test_login_imports_within_budget():
+    startup = _run_startup()
+    assert startup["elapsed"] < IMPORT_TIME_BUDGET, f"import took {startup['elapsed']:.2f}s"
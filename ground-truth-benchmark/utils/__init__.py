@@ -1,62 +1,46 @@
-# Authentication functions
-from utils.auth import (
-    get_json_db,
-    check_rate_limit,
-    authenticate_user,
-    check_session_timeout,
-    logout,
-    check_login,
-)
+"""Helpers for the Streamlit pages.
 
-# SharePoint functions
-from utils.sharepoint import (
-    get_document_libraries,
-    get_files_in_eval_benchmark,
-    get_file_item,
-    upload_to_eval_benchmark,
-    get_access_token,
-    get_site_id,
-    get_all_documents_from_list
-)
+Names are imported from their submodule on first access, so a page only pays
+for what it uses (the login page never loads pandas or builds an S3 client).
+"""
+import importlib
 
-# UI helper functions
-from utils.form import (
-    add_document,
-    remove_document,
-    handle_new_tag,
-    add_partial_answer,
-    remove_partial_answer,
-    add_reference_to_partial,
-    remove_reference_from_partial
-)
+import streamlit as st
 
-# File storage functions
-from utils.file_storage import (
-    get_files_from_storage,
-    upload_to_storage,
-    get_unique_filename
-)
+from gtruth.config import configure, set_error_handler
 
-# S3 functions
-from utils.s3 import (
-    upload_file, 
-    list_files, 
-    file_exists,
-    read_json_from_s3,
-    write_json_to_s3,
-    get_all_tags_from_list
-)
-
-__all__ = [
-    # Auth functions
+# Run the headless core with the app's secrets and show store errors on the page
+configure(st.secrets)
+set_error_handler(st.error)
+
+# Exported name -> submodule it lives in
+_EXPORTS = {}
+
+# Authentication functions
+_EXPORTS.update(dict.fromkeys([
     'get_json_db',
+    'get_user_directory',
+    'get_user',
+    'invalidate_user_directory',
+    'verify_password',
     'check_rate_limit',
-    'authenticate_user', 
+    'authenticate_user',
     'check_session_timeout',
-    'logout', 
-    'check_login',
-    
-    # SharePoint functions
+    'logout',
+    'check_login'
+], 'utils.auth'))
+
+# Login rate limiting
+_EXPORTS.update(dict.fromkeys([
+    'RateLimiter',
+    'MemoryRateLimiter',
+    'SQLiteRateLimiter',
+    'create_rate_limiter',
+    'get_rate_limiter'
+], 'utils.rate_limit'))
+
+# SharePoint functions
+_EXPORTS.update(dict.fromkeys([
     'get_document_libraries',
     'get_files_in_eval_benchmark',
     'get_file_item',
@@ -64,26 +48,133 @@ __all__ = [
     'get_access_token',
     'get_site_id',
     'get_all_documents_from_list',
-    
-    # File storage functions
-    'get_files_from_storage',
-    'upload_to_storage',
-    'get_unique_filename',
-    
-    # Form helper functions
+    'sync_eval_benchmark',
+    'get_graph_credentials',
+    'resolve_eval_benchmark',
+    'invalidate_eval_benchmark'
+], 'utils.sharepoint'))
+
+# Graph HTTP client
+_EXPORTS.update(dict.fromkeys([
+    'get_graph_session',
+    'graph_request',
+    'graph_get'
+], 'utils.graph'))
+
+# UI helper functions
+_EXPORTS.update(dict.fromkeys([
     'add_document',
     'remove_document',
     'handle_new_tag',
     'add_partial_answer',
     'remove_partial_answer',
     'add_reference_to_partial',
-    'remove_reference_from_partial',
-    
-    # S3 functions
-    'upload_file', 
-    'list_files', 
+    'remove_reference_from_partial'
+], 'utils.form'))
+
+# File storage functions
+_EXPORTS.update(dict.fromkeys([
+    'get_files_from_storage',
+    'get_listing_status',
+    'get_document_catalog',
+    'refresh_document_catalog',
+    'upload_to_storage',
+    'upload_many_to_storage',
+    'get_unique_filename',
+    'get_unique_filenames',
+    'compute_sha256',
+    'compute_sha256_many',
+    'find_duplicate_uploads'
+], 'utils.file_storage'))
+
+# Document catalog functions
+_EXPORTS.update(dict.fromkeys([
+    'load_catalog',
+    'load_hash_index',
+    'refresh_catalog',
+    'record_uploads'
+], 'utils.catalog'))
+
+# S3 functions
+_EXPORTS.update(dict.fromkeys([
+    'upload_file',
+    'upload_buffer',
+    'BufferReader',
+    'list_files',
+    'list_file_objects',
+    'invalidate_document_index',
     'file_exists',
     'read_json_from_s3',
     'write_json_to_s3',
+    'read_json_with_etag',
+    'update_json_in_s3',
+    'invalidate_json_cache',
     'get_all_tags_from_list'
-]
\ No newline at end of file
+], 'utils.s3'))
+
+# Question store functions
+_EXPORTS.update(dict.fromkeys([
+    'load_questions',
+    'load_questions_with_version',
+    'save_question',
+    'load_facets',
+    'rebuild_facets',
+    'compact_questions',
+    'migrate_legacy_questions',
+    'iter_question_batches',
+    'save_question_batches'
+], 'utils.question_store'))
+
+# Ground truth library view functions
+_EXPORTS.update(dict.fromkeys([
+    'build_library_table',
+    'get_library_table',
+    'filter_library',
+    'paginate',
+    'format_question_detail'
+], 'utils.library'))
+
+# Search functions
+_EXPORTS.update(dict.fromkeys([
+    'SearchIndex',
+    'get_search_index',
+    'index_question',
+    'search_questions'
+], 'utils.search'))
+
+# Reference index functions
+_EXPORTS.update(dict.fromkeys([
+    'parse_pages',
+    'ReferenceIndex',
+    'get_reference_index',
+    'index_question_references'
+], 'utils.references'))
+
+# Export functions
+_EXPORTS.update(dict.fromkeys([
+    'export_questions',
+    'iter_jsonl_rows',
+    'iter_reference_rows'
+], 'utils.export'))
+
+# Bulk import functions
+_EXPORTS.update(dict.fromkeys([
+    'iter_import_rows',
+    'validate_import_rows',
+    'import_questions'
+], 'utils.importer'))
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    """Import an exported name from its submodule on first use."""
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'utils' has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
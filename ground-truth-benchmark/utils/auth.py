@@ -1,55 +1,116 @@
 import streamlit as st
+import math
+import threading
 import time
 import bcrypt
 
-from utils.s3 import read_json_from_s3
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from utils.rate_limit import get_rate_limiter
+from utils.s3 import read_json_with_etag, invalidate_json_cache
 
-failed_attempts = {}
 RATE_LIMIT_MAX_ATTEMPTS = 5
 RATE_LIMIT_WINDOW = 300  # 5 minutes
 SESSION_TIMEOUT = 1800  # 30 minutes
 
+USERS_FILE = "users.json"
+USER_DIRECTORY_TTL = 10  # seconds before users.json is revalidated by ETag
+
+# bcrypt is deliberately slow; run it on a few worker threads and turn logins
+# away once too many are waiting instead of tying up every script thread
+BCRYPT_WORKERS = 2
+BCRYPT_MAX_PENDING = 16
+BCRYPT_TIMEOUT = 10  # seconds
+
+# {username: user record}, rebuilt only when the users.json ETag changes
+_user_directory = {"etag": None, "users": {}}
+_user_directory_lock = threading.Lock()
+
+_bcrypt_pool = None
+_bcrypt_pool_lock = threading.Lock()
+_bcrypt_slots = threading.BoundedSemaphore(BCRYPT_MAX_PENDING)
+
+def _as_users(data):
+    """Normalize users.json, with or without a top-level "users" key, to {username: record}."""
+    if not isinstance(data, dict):
+        return {}
+    users = data.get("users", data)
+    return users if isinstance(users, dict) else {}
+
+def get_user_directory():
+    """Return the process-wide {username: user record} directory.
+
+    users.json is read once and revalidated by ETag every USER_DIRECTORY_TTL
+    seconds; the directory is only rebuilt when the file changed. The result
+    is read-only.
+    """
+    data, etag = read_json_with_etag(USERS_FILE, ttl=USER_DIRECTORY_TTL)
+    with _user_directory_lock:
+        if etag is None or etag != _user_directory["etag"]:
+            _user_directory.update(etag=etag, users=_as_users(data))
+        return _user_directory["users"]
+
+def get_user(username):
+    """Look up one user record, or None."""
+    return get_user_directory().get(username)
+
+def invalidate_user_directory():
+    """Force the next lookup to re-read users.json, e.g. after it was edited outside the app."""
+    invalidate_json_cache(USERS_FILE)
+    with _user_directory_lock:
+        _user_directory.update(etag=None, users={})
+
 def get_json_db():
     """Retrieve the user database from S3."""
     try:
-        data = read_json_from_s3("users.json")
-        if not data:
-            return {"users": {}}
-        if "users" not in data:
-            data = {"users": data} if isinstance(data, dict) else {"users": {}}
-        return data
+        return {"users": get_user_directory()}
     except Exception:
         return {"users": {}}
 
+def _get_bcrypt_pool():
+    global _bcrypt_pool
+    with _bcrypt_pool_lock:
+        if _bcrypt_pool is None:
+            _bcrypt_pool = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+        return _bcrypt_pool
+
+def verify_password(password, password_hash):
+    """Check a password against its bcrypt hash on the bounded worker pool.
+
+    Returns True or False, or None if too many verifications are already
+    waiting or the check timed out.
+    """
+    if not _bcrypt_slots.acquire(blocking=False):
+        return None
+    try:
+        future = _get_bcrypt_pool().submit(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+    except Exception:
+        _bcrypt_slots.release()
+        raise
+    future.add_done_callback(lambda _: _bcrypt_slots.release())
+
+    try:
+        return future.result(timeout=BCRYPT_TIMEOUT)
+    except TimeoutError:
+        return None
+
 def check_rate_limit(username):
     """Check if the user has exceeded the allowed login attempts."""
-    current_time = time.time()
-    
-    # Clear old failed attempts
-    for user in list(failed_attempts.keys()):
-        if current_time - failed_attempts[user]["timestamp"] > RATE_LIMIT_WINDOW:
-            del failed_attempts[user]
-    
-    # Check if the user is rate limited
-    if username in failed_attempts:
-        attempts = failed_attempts[username]
-        if attempts["count"] >= RATE_LIMIT_MAX_ATTEMPTS:
-            if current_time - attempts["timestamp"] < RATE_LIMIT_WINDOW:
-                minutes_left = int((attempts['timestamp'] + RATE_LIMIT_WINDOW - current_time) / 60)
-                return False, f"Too many failed attempts. Try again in {minutes_left} minutes."
-            else:
-                failed_attempts[username] = {"count": 0, "timestamp": current_time}
-    
+    try:
+        retry_after = get_rate_limiter(RATE_LIMIT_MAX_ATTEMPTS, RATE_LIMIT_WINDOW).check(username)
+    except Exception:
+        return True, ""  # never lock everyone out because the limiter store failed
+
+    if retry_after > 0:
+        minutes_left = max(1, math.ceil(retry_after / 60))
+        return False, f"Too many failed attempts. Try again in {minutes_left} minutes."
     return True, ""
 
 def record_failed_attempt(username):
     """Record a failed login attempt."""
-    current_time = time.time()
-    if username in failed_attempts:
-        failed_attempts[username]["count"] += 1
-        failed_attempts[username]["timestamp"] = current_time
-    else:
-        failed_attempts[username] = {"count": 1, "timestamp": current_time}
+    try:
+        get_rate_limiter(RATE_LIMIT_MAX_ATTEMPTS, RATE_LIMIT_WINDOW).hit(username)
+    except Exception:
+        pass
 
 def check_session_timeout():
     """Log the user out if the session has been inactive for too long."""
@@ -82,32 +143,28 @@ def authenticate_user(username, password):
         return False
     
     try:
-        json_db = get_json_db()
-        
-        if username not in json_db["users"]:
-            record_failed_attempt(username)
-            return False
-        
-        user_data = json_db["users"][username]
-        
-        if "password_hash" not in user_data:
+        user_data = get_user(username)
+
+        if not user_data or "password_hash" not in user_data:
             record_failed_attempt(username)
             return False
-            
-        stored_password = user_data["password_hash"]
-        
+
         try:
-            if bcrypt.checkpw(password.encode('utf-8'), stored_password.encode('utf-8')):
-                st.session_state["authenticated"] = True
-                st.session_state["username"] = username
-                return True
-            else:
-                record_failed_attempt(username)
-                return False
+            verified = verify_password(password, user_data["password_hash"])
         except Exception:
-            record_failed_attempt(username)
+            verified = False
+
+        if verified is None:
+            st.error("Too many logins in progress. Please try again in a moment.")
             return False
-            
+        if verified:
+            st.session_state["authenticated"] = True
+            st.session_state["username"] = username
+            return True
+
+        record_failed_attempt(username)
+        return False
+
     except Exception:
         return False
 
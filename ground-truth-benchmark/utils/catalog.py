@@ -0,0 +1,11 @@
+"""Streamlit app import path for gtruth.catalog."""
+from gtruth.catalog import (
+    CATALOG_FILE,
+    CATALOG_REFRESH_TTL,
+    SOURCE_ORDER,
+    load_catalog,
+    load_hash_index,
+    catalog_is_stale,
+    refresh_catalog,
+    record_uploads
+)
@@ -0,0 +1,11 @@
+"""Streamlit app import path for gtruth.export."""
+from gtruth.export import (
+    JSONL_ROW_TYPES,
+    PARQUET_CHUNK_ROWS,
+    PARQUET_PART_PATTERN,
+    PARQUET_STATE_FILE,
+    question_matches,
+    iter_jsonl_rows,
+    iter_reference_rows,
+    export_questions
+)
@@ -1,89 +1,340 @@
 import streamlit as st
-import pandas as pd
-import os
-import tempfile
-from utils.s3 import upload_file, list_files
-from utils.sharepoint import get_files_in_eval_benchmark, upload_to_eval_benchmark
+import hashlib
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from utils.s3 import upload_buffer, list_file_objects
+from utils.sharepoint import sync_eval_benchmark, upload_to_eval_benchmark, get_graph_credentials
+from utils.catalog import load_catalog, load_hash_index, refresh_catalog, record_uploads, catalog_is_stale
+
+UPLOAD_WORKERS = 8
+SHAREPOINT_UPLOAD_CONCURRENCY = 4
+S3_UPLOAD_CONCURRENCY = 6
+HASH_CHUNK_SIZE = 1024 * 1024
+# Seconds a page waits for each backend's listing before using its last known one
+LISTING_TIMEOUTS = {"SharePoint": 15, "S3": 10}
+
+# Shared by every session so concurrent batches respect the same per-store limits
+_backend_slots = {
+    "SharePoint": threading.BoundedSemaphore(SHAREPOINT_UPLOAD_CONCURRENCY),
+    "S3": threading.BoundedSemaphore(S3_UPLOAD_CONCURRENCY),
+}
+
+# Backends are listed concurrently on a shared pool. A listing that overruns
+# its timeout keeps running and later calls wait on it instead of starting
+# another; meanwhile its last successful result is served marked stale.
+_listing_pool = ThreadPoolExecutor(max_workers=len(LISTING_TIMEOUTS), thread_name_prefix="listing")
+_listings = {source: {"future": None, "files": None, "listed_at": None, "error": None} for source in LISTING_TIMEOUTS}
+_listings_lock = threading.Lock()
+
+def _list_sharepoint_files():
+    """List the Eval Benchmark folder; raises if SharePoint cannot be reached."""
+    TOKEN, SITE_ID = get_graph_credentials()
+    if not TOKEN or not SITE_ID:
+        raise RuntimeError("SharePoint credentials are not available")
 
-def get_files_from_storage():
-    """Get files from both SharePoint and S3 storage."""
     files = []
-    
-    # Get SharePoint files
-    TOKEN = st.session_state.get("token")
-    SITE_ID = st.session_state.get("site_id")
-    if TOKEN and SITE_ID:
-        drive_id = st.session_state.get("document_drive_id")
-        if drive_id:
-            sharepoint_files = get_files_in_eval_benchmark(TOKEN, drive_id)
-            if sharepoint_files:
-                for file in sharepoint_files:
-                    if "folder" not in file:
-                        files.append({
-                            "name": file["name"],
-                            "source": "SharePoint",
-                            "lastModified": file.get("lastModifiedDateTime", ""),
-                            "createdBy": file.get("createdBy", {}).get("user", {}).get("displayName", "Unknown")
-                        })
-
-    # Get S3 files
-    s3_files = list_files()
-    for file_name in s3_files:
+    for file in sync_eval_benchmark(TOKEN):
+        if "folder" not in file:
+            files.append({
+                "name": file["name"],
+                "source": "SharePoint",
+                "lastModified": file.get("lastModifiedDateTime", ""),
+                "size": file.get("size", 0),
+                "createdBy": file.get("createdBy", {}).get("user", {}).get("displayName", "Unknown")
+            })
+    return files
+
+def _list_s3_files():
+    """List the S3 documents prefix."""
+    files = []
+    for s3_file in list_file_objects():
         files.append({
-            "name": file_name,
+            "name": s3_file["name"],
             "source": "S3",
-            "lastModified": pd.Timestamp.now().strftime("%Y-%m-%d"),
+            "lastModified": s3_file["lastModified"],
+            "size": s3_file["size"],
             "createdBy": "Unknown"
         })
+    return files
+
+def _start_listings():
+    """Submit a listing for every backend that is not already being listed."""
+    list_sources = {"SharePoint": _list_sharepoint_files, "S3": _list_s3_files}
+    futures = {}
+    with _listings_lock:
+        for source, state in _listings.items():
+            future = state["future"]
+            if future is not None and future.done() and future.exception() is None:
+                # A listing that overran an earlier page still refreshes the last known files
+                state.update(files=future.result(), listed_at=time.time())
+            if future is None or future.done():
+                state["future"] = _listing_pool.submit(list_sources[source])
+            futures[source] = state["future"]
+    return futures
 
+def _list_storage():
+    """List every backend concurrently, returning (files, names of the backends that answered).
+
+    Each backend gets its own timeout from LISTING_TIMEOUTS, so the wait is
+    the slowest backend's rather than the sum. A backend that fails or times
+    out contributes its last successful listing with "stale": True on each
+    file, and is left out of the answered backends.
+    """
+    futures = _start_listings()
+    started = time.monotonic()
+
+    files = []
+    listed_sources = []
+    for source, future in futures.items():
+        remaining = started + LISTING_TIMEOUTS[source] - time.monotonic()
+        try:
+            result = future.result(timeout=max(0, remaining))
+        except Exception as e:
+            with _listings_lock:
+                state = _listings[source]
+                state["error"] = "timed out" if not future.done() else str(e) or type(e).__name__
+                files.extend(dict(file, stale=True) for file in state["files"] or [])
+            continue
+
+        with _listings_lock:
+            _listings[source].update(files=result, listed_at=time.time(), error=None)
+        files.extend(result)
+        listed_sources.append(source)
+    return files, listed_sources
+
+def get_listing_status():
+    """Return {backend: {"fresh", "listedAt", "error"}} for the most recent listing.
+
+    listedAt is the epoch time of the backend's last successful listing, or None.
+    """
+    with _listings_lock:
+        return {
+            source: {
+                "fresh": state["error"] is None and state["listed_at"] is not None,
+                "listedAt": state["listed_at"],
+                "error": state["error"],
+            }
+            for source, state in _listings.items()
+        }
+
+def get_files_from_storage():
+    """Get files from both SharePoint and S3 storage.
+
+    Files served from a backend's last known listing carry "stale": True.
+    """
+    files, _ = _list_storage()
     return files
 
-def upload_to_storage(file_name, file_bytes):
-    results = []
-    TOKEN = st.session_state.get("token")
-    SITE_ID = st.session_state.get("site_id")
-    
-    if TOKEN and SITE_ID:
+def refresh_document_catalog():
+    """Re-list both stores and fold the result into the shared document catalog."""
+    with st.spinner("Loading files..."):
+        files, listed_sources = _list_storage()
+    return refresh_catalog([file for file in files if not file.get("stale")], listed_sources)
+
+def get_document_catalog(force_refresh=False):
+    """Return the document catalog as {name: entry}, shared by every page.
+
+    Listings are only re-run when this process has not refreshed the catalog
+    for CATALOG_REFRESH_TTL seconds, or when force_refresh is set.
+    """
+    if force_refresh or catalog_is_stale():
+        refresh_document_catalog()
+    return load_catalog()
+
+def _upload_to_sharepoint(token, site_id, file_name, file_bytes):
+    """Upload one file to SharePoint, limited to SHAREPOINT_UPLOAD_CONCURRENCY at a time."""
+    with _backend_slots["SharePoint"]:
         try:
-            sharepoint_result = upload_to_eval_benchmark(TOKEN, SITE_ID, file_name, file_bytes)
-            results.append(("SharePoint", sharepoint_result))
+            return bool(upload_to_eval_benchmark(token, site_id, file_name, file_bytes))
         except Exception:
-            results.append(("SharePoint", False))
-
-    try:
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            temp_file_path = temp_file.name
-            temp_file.write(file_bytes)
-        
-        s3_result = upload_file(temp_file_path, target_filename=file_name)  
-        results.append(("S3", s3_result))
-    except Exception:
-        results.append(("S3", False))
-    finally:
+            return False
+
+def _upload_to_s3(file_name, file_bytes):
+    """Upload one file to S3, limited to S3_UPLOAD_CONCURRENCY at a time."""
+    with _backend_slots["S3"]:
         try:
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
+            return upload_buffer(file_bytes, file_name)
         except Exception:
-            pass
+            return False
+
+def _as_buffer(file_data):
+    """Return a zero-copy view of bytes, a memoryview, or an in-memory file."""
+    if hasattr(file_data, "getbuffer"):
+        return file_data.getbuffer()
+    return memoryview(file_data)
 
-    return results
+def compute_sha256(file_data):
+    """Hash bytes, a memoryview, or an in-memory file in chunks, without copying it."""
+    view = _as_buffer(file_data)
+    digest = hashlib.sha256()
+    for offset in range(0, len(view), HASH_CHUNK_SIZE):
+        digest.update(view[offset:offset + HASH_CHUNK_SIZE])
+    return digest.hexdigest()
+
+def compute_sha256_many(files):
+    """Hash several files in parallel (hashlib releases the GIL on large buffers)."""
+    if not files:
+        return []
+    with ThreadPoolExecutor(max_workers=min(UPLOAD_WORKERS, len(files))) as executor:
+        return list(executor.map(compute_sha256, files))
+
+def find_duplicate_uploads(hashes):
+    """Return, for each content hash, (name it is already stored under, batch index) or None.
+
+    The first file of the batch with a stored hash gets (stored name, None).
+    Files repeated within the batch point at the first file with the same
+    content through its index; the stored name is filled in too if there is
+    one. Only files with a None batch index need to be sent anywhere.
+    """
+    hash_index = load_hash_index()
+    batch_hashes = {}
+    duplicates = []
+    for index, sha256 in enumerate(hashes):
+        if sha256 in batch_hashes:
+            duplicates.append((hash_index.get(sha256), batch_hashes[sha256]))
+            continue
+        batch_hashes[sha256] = index
+        duplicates.append((hash_index[sha256], None) if sha256 in hash_index else None)
+    return duplicates
+
+def upload_many_to_storage(files, on_progress=None, hashes=None):
+    """Upload (file_name, file_data) pairs to every store concurrently.
+
+    file_data may be bytes, a memoryview, or an in-memory file such as a
+    Streamlit UploadedFile; it is read through a view, never copied whole.
+    Each file goes to SharePoint and S3 in parallel on a bounded worker pool,
+    with a separate concurrency limit per store.
+
+    Uploads are content-addressed: a file whose SHA-256 is already in the
+    catalog is stored under the existing name, and only sent to stores that do
+    not hold it yet; a file repeated within the batch is sent once. Pass hashes
+    (from compute_sha256_many) to avoid hashing the batch again.
+
+    Returns [(stored_name, [(storage, succeeded), ...]), ...] in input order.
+    on_progress(done, total, stored_name, results) is called from the caller's
+    thread as each file finishes on all stores.
+    """
+    TOKEN, SITE_ID = get_graph_credentials()
+    stores = []
+    if TOKEN and SITE_ID:
+        stores.append(("SharePoint", partial(_upload_to_sharepoint, TOKEN, SITE_ID)))
+    stores.append(("S3", _upload_to_s3))
+
+    if not files:
+        return []
+    buffers = [_as_buffer(file_data) for _, file_data in files]
+    if hashes is None:
+        hashes = compute_sha256_many(buffers)
+
+    catalog = load_catalog()
+    duplicates = find_duplicate_uploads(hashes)
+    targets = []
+    for index, duplicate in enumerate(duplicates):
+        if duplicate is None:
+            targets.append((files[index][0], set()))
+        elif duplicate[1] is not None:
+            # Same content as an earlier file in this batch: reuse its results
+            targets.append((targets[duplicate[1]][0], None))
+        else:
+            stored_name = duplicate[0]
+            targets.append((stored_name, set(catalog.get(stored_name, {}).get("sources", []))))
+
+    results = [{} for _ in files]
+    pending = [len(stores) for _ in files]
+    done = 0
+
+    def report(index):
+        nonlocal done
+        done += 1
+        if on_progress:
+            file_results = [(name, results[index][name]) for name, _ in stores]
+            on_progress(done, len(files), targets[index][0], file_results)
+
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+        futures = {}
+        for index, (target_name, existing_sources) in enumerate(targets):
+            if existing_sources is None:
+                continue
+            for storage, upload in stores:
+                if storage in existing_sources:
+                    # Identical bytes are already there; skip the transfer
+                    results[index][storage] = True
+                    pending[index] -= 1
+                else:
+                    futures[executor.submit(upload, target_name, buffers[index])] = (index, storage)
+            if pending[index] == 0:
+                report(index)
+
+        for future in as_completed(futures):
+            index, storage = futures[future]
+            results[index][storage] = future.result()
+            pending[index] -= 1
+            if pending[index] == 0:
+                report(index)
+
+    for index, (target_name, existing_sources) in enumerate(targets):
+        if existing_sources is None:
+            results[index] = results[duplicates[index][1]]
+            report(index)
+
+    uploads = []
+    for index, (target_name, existing_sources) in enumerate(targets):
+        if existing_sources is None:
+            continue
+        sources = [
+            storage for storage, _ in stores
+            if results[index][storage] and storage not in existing_sources
+        ]
+        if sources:
+            uploads.append({
+                "name": target_name,
+                "sources": sources,
+                "size": len(buffers[index]),
+                "sha256": hashes[index]
+            })
+    record_uploads(uploads)
+
+    return [
+        (target_name, [(storage, results[index][storage]) for storage, _ in stores])
+        for index, (target_name, _) in enumerate(targets)
+    ]
+
+def upload_to_storage(file_name, file_bytes):
+    """Upload a single file to every store in parallel."""
+    return upload_many_to_storage([(file_name, file_bytes)])[0][1]
+
+def _reserve_filename(original_filename, taken_filenames):
+    """Pick the first free "name copy(n).ext" variant and add it to taken_filenames."""
+    new_filename = original_filename
+
+    if new_filename in taken_filenames:
+        name_parts = original_filename.rsplit('.', 1)
+        base_name = name_parts[0]
+        extension = f".{name_parts[1]}" if len(name_parts) > 1 else ""
+
+        counter = 1
+        while new_filename in taken_filenames:
+            new_filename = f"{base_name} copy({counter}){extension}"
+            counter += 1
+
+    taken_filenames.add(new_filename)
+    return new_filename
+
+def get_unique_filenames(original_filenames, existing_filenames=None):
+    """Generate unique filenames for a whole batch with a single storage lookup.
+
+    Names assigned earlier in the batch count as taken, so two files with the
+    same name never both become the same copy(n).
+    """
+    if existing_filenames is None:
+        existing_filenames = get_document_catalog().keys()
+    taken_filenames = set(existing_filenames)
+
+    return [_reserve_filename(name, taken_filenames) for name in original_filenames]
 
 def get_unique_filename(original_filename):
     """Generate unique filename to avoid overwriting existing files."""
-    existing_filenames = {file["name"] for file in get_files_from_storage()}
-    
-    if original_filename not in existing_filenames:
-        return original_filename
-        
-    name_parts = original_filename.rsplit('.', 1)
-    base_name = name_parts[0]
-    extension = f".{name_parts[1]}" if len(name_parts) > 1 else ""
-
-    counter = 1
-    new_filename = original_filename
-    
-    while new_filename in existing_filenames:
-        new_filename = f"{base_name} copy({counter}){extension}"
-        counter += 1
-        
-    return new_filename
\ No newline at end of file
+    return get_unique_filenames([original_filename])[0]
@@ -0,0 +1,14 @@
+"""Streamlit app import path for gtruth.graph."""
+from gtruth.graph import (
+    GRAPH_TIMEOUT,
+    GRAPH_MAX_RETRIES,
+    GRAPH_BACKOFF,
+    GRAPH_MAX_RETRY_AFTER,
+    GRAPH_POOL_SIZE,
+    RETRY_STATUSES,
+    RETRY_STATUSES_UNSAFE,
+    IDEMPOTENT_METHODS,
+    get_graph_session,
+    graph_request,
+    graph_get
+)
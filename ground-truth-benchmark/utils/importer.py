@@ -0,0 +1,10 @@
+"""Streamlit app import path for gtruth.importer."""
+from gtruth.importer import (
+    IMPORT_FORMATS,
+    IMPORT_BATCH_SIZE,
+    CSV_REQUIRED_COLUMNS,
+    CSV_TAG_SEPARATOR,
+    iter_import_rows,
+    validate_import_rows,
+    import_questions
+)
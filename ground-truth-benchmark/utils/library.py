@@ -0,0 +1,87 @@
+import threading
+
+import pandas as pd
+
+LIBRARY_PAGE_SIZES = [25, 50, 100, 250]
+DISPLAY_COLUMNS = ["Question", "Agent Name", "Tags", "Partial Answers", "Created On", "Submitted By"]
+
+# Flattened library table, rebuilt only when the question store version changes
+_table_cache = {"version": None, "table": None}
+_table_lock = threading.Lock()
+
+
+def build_library_table(questions):
+    """Flatten the questions dict into a DataFrame, one column at a time."""
+    question_ids = list(questions)
+    entries = list(questions.values())
+    tag_lists = [tuple(entry.get("tags", [])) for entry in entries]
+
+    return pd.DataFrame({
+        "id": question_ids,
+        "Question": [entry.get("question", "") for entry in entries],
+        "Agent Name": [entry.get("agent_name", "") for entry in entries],
+        "Tags": [", ".join(tags) for tags in tag_lists],
+        "Partial Answers": [len(entry.get("partial_answers", [])) for entry in entries],
+        "Created On": [entry.get("created_on", "") for entry in entries],
+        "Submitted By": [entry.get("submitted_by", "Unknown") for entry in entries],
+        "tag_list": tag_lists,
+    })
+
+def get_library_table(questions, version):
+    """Return the flattened library table, cached per question store version."""
+    with _table_lock:
+        if _table_cache["table"] is not None and _table_cache["version"] == version:
+            return _table_cache["table"]
+
+    table = build_library_table(questions)
+    with _table_lock:
+        _table_cache.update(version=version, table=table)
+    return table
+
+def filter_library(table, agents=None, tags=None, submitters=None, date_range=None):
+    """Filter the library table by agent, tag (any of), submitter and created date.
+
+    date_range is an inclusive (start, end) pair of dates; either may be None.
+    """
+    mask = pd.Series(True, index=table.index)
+
+    if agents:
+        mask &= table["Agent Name"].isin(agents)
+    if submitters:
+        mask &= table["Submitted By"].isin(submitters)
+    if tags:
+        wanted = set(tags)
+        mask &= table["tag_list"].map(lambda question_tags: not wanted.isdisjoint(question_tags))
+    if date_range:
+        start, end = date_range
+        # created_on is stored as YYYY-MM-DD, so string comparison orders by date
+        if start:
+            mask &= table["Created On"] >= str(start)
+        if end:
+            mask &= table["Created On"] <= str(end)
+
+    return table[mask]
+
+def paginate(table, page, page_size):
+    """Return (rows on the 1-based page, total page count)."""
+    page_count = max(1, -(-len(table) // page_size))
+    page = min(max(1, page), page_count)
+    start = (page - 1) * page_size
+    return table.iloc[start:start + page_size], page_count
+
+def format_question_detail(entry):
+    """Render one question's partial answers and references as markdown."""
+    sections = []
+    for i, pa in enumerate(entry.get("partial_answers", [])):
+        refs_display = []
+        for ref in pa.get("references", []):
+            pages = ref.get("page", [])
+            sources = ref.get("source", ["Unknown"])
+            pages_text = ", ".join(pages) if isinstance(pages, list) else pages
+            sources_text = ", ".join(sources) if isinstance(sources, list) else sources
+            refs_display.append(f"- {ref.get('document', '')} (Pages: {pages_text}) [Source: {sources_text}]")
+
+        refs_text = "\n".join(refs_display)
+        sections.append(f"**Part. {i+1}:** {pa.get('answer', '')}\n\nReferences:\n{refs_text}")
+
+    return "\n\n".join(sections)
@@ -0,0 +1,21 @@
+"""Streamlit app import path for gtruth.question_store."""
+from gtruth.question_store import (
+    QUESTIONS_FOLDER,
+    MANIFEST_FILE,
+    FACETS_FILE,
+    FACET_FIELDS,
+    LEGACY_QUESTIONS_FILE,
+    SEGMENT_SIZE,
+    READ_WORKERS,
+    IMMUTABLE_TTL,
+    rebuild_facets,
+    load_facets,
+    migrate_legacy_questions,
+    load_questions,
+    load_questions_with_version,
+    get_store_stats,
+    iter_question_batches,
+    compact_questions,
+    save_question,
+    save_question_batches
+)
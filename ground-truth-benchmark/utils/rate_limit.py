@@ -0,0 +1,14 @@
+"""Streamlit app import path for gtruth.rate_limit."""
+from gtruth.rate_limit import (
+    RATE_LIMIT_BACKENDS,
+    RATE_LIMIT_DIR,
+    RATE_LIMIT_DB,
+    RATE_LIMIT_MAX_KEYS,
+    SQLITE_TIMEOUT,
+    SQLITE_EVICT_EVERY,
+    RateLimiter,
+    MemoryRateLimiter,
+    SQLiteRateLimiter,
+    create_rate_limiter,
+    get_rate_limiter
+)
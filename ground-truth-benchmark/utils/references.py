@@ -0,0 +1,8 @@
+"""Streamlit app import path for gtruth.references."""
+from gtruth.references import (
+    PAGE_RANGE_PATTERN,
+    parse_pages,
+    ReferenceIndex,
+    get_reference_index,
+    index_question_references
+)
@@ -0,0 +1,14 @@
+"""Streamlit app import path for gtruth.search."""
+from gtruth.search import (
+    SEARCH_INDEX_FILE,
+    SNAPSHOT_MIN_CHANGES,
+    BM25_K1,
+    BM25_B,
+    FACET_FIELDS,
+    TOKEN_PATTERN,
+    tokenize,
+    SearchIndex,
+    get_search_index,
+    index_question,
+    search_questions
+)